@@ -0,0 +1,370 @@
+#Arena.py
+#Hundreds of snakes, each steered by a scripted controller, sharing one board with many food items.
+#Every snake lives on one occupancy grid: occupied has a byte per cell set while any snake is on it and owner holds the id
+#of that snake, and food has a byte per cell set while food is on it. Every collision is a lookup of the cell a head is
+#moving into, so a tick costs the same whatever the snakes' lengths, and grows only with the number of snakes.
+#Food is also kept in a spatial hash of square buckets, so each snake finds the nearest food without scanning all of it.
+#Run this module to print the tick rate for a range of snake counts, or with --watch to see an arena played.
+#Example: python arena.py --snakes 100 200 400 --cols 300 --rows 300
+
+import argparse
+import random
+import time
+from collections import deque
+from array import array
+
+import engine
+import controllers
+
+BUCKET = 8                  #Width and height, in cells, of the food spatial hash's buckets.
+EMPTY = -1                  #Owner of a cell no snake is on.
+#Controllers that only look at the board as it is on each tick. The autopilot works out when a body cell frees up from
+#the ticks its own head entered each cell, which says nothing of cells other snakes are on, and it keeps an array the size
+#of the board for every snake, so it can't steer arena snakes.
+CONTROLLERS = ("random", "greedy", "bfs", "hamiltonian")
+
+#One snake of an arena.
+#It answers to the same names as engine.Engine (head, body, direction, occupied, food, cols, rows...), so the scripted
+#controllers of controllers.py can steer it. Its food is the food nearest to its head, which it keeps heading for until
+#that food is eaten.
+class ArenaSnake():
+    def __init__(self, arena, id, controller):
+        self.arena = arena
+        self.id = id
+        self.controller = controller
+        self.body = deque()
+        self.direction = engine.RIGHT
+        self.alive = False
+        self.target = None
+        self.next = None            #The cell the head moves into on the tick being stepped.
+        self.eats = False
+        self.eaten = 0              #Food eaten and snakes killed over every life of this snake.
+        self.kills = 0
+        self.deaths = 0
+
+    @property
+    def cols(self):
+        return self.arena.cols
+
+    @property
+    def rows(self):
+        return self.arena.rows
+
+    @property
+    def occupied(self):
+        return self.arena.occupied
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def length(self):
+        return len(self.body)
+
+    @property
+    def food(self):
+        if self.target is None or not self.arena.food[self.target]:
+            self.target = self.arena.nearest_food(self.head)
+        return self.target
+
+    def cell(self, col, row):
+        return self.arena.cell(col, row)
+
+    def position(self, cell):
+        return self.arena.position(cell)
+
+    def next_cell(self):
+        col, row = self.arena.position(self.head)
+        return self.arena.cell(col + self.direction[0], row + self.direction[1])
+
+    def turn(self, direction):
+        if direction is not None and direction != engine.OPPOSITE[self.direction]:
+            self.direction = direction
+
+#A board of cols * rows cells shared by every snake, with food_count food items kept on it.
+#free lists every cell that has neither a snake nor food on it and slot holds each cell's index in free, as in
+#engine.Engine, so snakes and food are placed on a uniformly random free cell in constant time.
+#If respawn is true, a snake that dies is put back on the board at once with its starting length, so the number of
+#snakes stays the same for as long as the arena runs.
+class Arena():
+    def __init__(self, cols, rows, food_count = 100, seed = None, respawn = True):
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        self.food_count = food_count
+        self.respawn = respawn
+        self.rng = random.Random(seed)
+        self.occupied = bytearray(self.size)
+        self.owner = array("i", [EMPTY]) * self.size
+        self.food = bytearray(self.size)
+        self.free = array("i", range(self.size))
+        self.slot = array("i", range(self.size))
+        self.bucket_cols = -(-cols // BUCKET)
+        self.bucket_rows = -(-rows // BUCKET)
+        self.buckets = {}           #Food cells by bucket, keyed by bucket column and row.
+        self.food_total = 0
+        self.snakes = []
+        self.start_length = 5
+        self.ticks = 0
+        self.deaths = 0
+        self.top_up_food()
+
+    def cell(self, col, row):
+        return (row % self.rows) * self.cols + col % self.cols
+
+    def position(self, cell):
+        row, col = divmod(cell, self.cols)
+        return col, row
+
+    #Takes a cell out of the free cells, the same way as engine.Engine.occupy.
+    def take(self, cell):
+        index = self.slot[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[index] = last
+            self.slot[last] = index
+        self.slot[cell] = -1
+
+    def release(self, cell):
+        self.slot[cell] = len(self.free)
+        self.free.append(cell)
+
+    def bucket(self, cell):
+        col, row = self.position(cell)
+        return col // BUCKET, row // BUCKET
+
+    def add_food(self, cell):
+        self.take(cell)
+        self.food[cell] = 1
+        self.food_total += 1
+        self.buckets.setdefault(self.bucket(cell), set()).add(cell)
+
+    #Takes the food off a cell, leaving the cell out of the free cells since the snake eating it is moving onto it.
+    def remove_food(self, cell):
+        self.food[cell] = 0
+        self.food_total -= 1
+        self.buckets[self.bucket(cell)].discard(cell)
+
+    #Places food on random free cells until there are food_count food items on the board, or no free cell is left.
+    def top_up_food(self):
+        while self.food_total < self.food_count and self.free:
+            self.add_food(self.free[self.rng.randrange(len(self.free))])
+
+    #Returns the food closest to a cell, going around the edges of the board if that's shorter, or None if there's none.
+    #Buckets are searched in growing square rings around the cell's bucket. Food in a ring of radius r is at least
+    #(r - 1) * BUCKET + 1 steps away, so the search stops once the closest food found is nearer than that. On boards
+    #whose size isn't a multiple of BUCKET the buckets at the far edge are narrower, so food across that edge may be a few
+    #steps closer than the one returned.
+    def nearest_food(self, cell):
+        col, row = self.position(cell)
+        bucket_col, bucket_row = col // BUCKET, row // BUCKET
+        best = None
+        best_distance = self.size
+        seen = set()
+        for radius in range(max(self.bucket_cols, self.bucket_rows) // 2 + 2):
+            if best is not None and best_distance <= (radius - 1) * BUCKET:
+                break
+            for dy in range(-radius, radius + 1):
+                step = 1 if abs(dy) == radius else 2 * radius
+                for dx in range(-radius, radius + 1, step or 1):
+                    key = ((bucket_col + dx) % self.bucket_cols, (bucket_row + dy) % self.bucket_rows)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    for food in self.buckets.get(key, ()):
+                        distance = controllers.distance(self, cell, food)
+                        if distance < best_distance:
+                            best, best_distance = food, distance
+        return best
+
+    #Adds a snake steered by the given controller and puts it on the board, returns it.
+    def add_snake(self, controller):
+        snake = ArenaSnake(self, len(self.snakes), controller)
+        self.snakes.append(snake)
+        self.place(snake)
+        return snake
+
+    #Puts a snake on the board in a straight line from a random free cell, with its head leading.
+    #Gives up, leaving the snake dead, if no free line is found after a few tries.
+    def place(self, snake):
+        for attempt in range(20):
+            if not self.free:
+                break
+            head = self.free[self.rng.randrange(len(self.free))]
+            direction = self.rng.choice(controllers.DIRECTIONS)
+            col, row = self.position(head)
+            cells = [self.cell(col - direction[0] * i, row - direction[1] * i) for i in range(self.start_length)]
+            if len(set(cells)) == len(cells) and all(self.slot[cell] != -1 for cell in cells):
+                snake.body = deque(cells)
+                snake.direction = direction
+                snake.alive = True
+                snake.target = None
+                for cell in cells:
+                    self.occupy(cell, snake.id)
+                snake.controller.reset(snake)
+                return True
+        snake.alive = False
+        return False
+
+    def occupy(self, cell, id):
+        self.take(cell)
+        self.occupied[cell] = 1
+        self.owner[cell] = id
+
+    def vacate(self, cell):
+        self.release(cell)
+        self.occupied[cell] = 0
+        self.owner[cell] = EMPTY
+
+    #Steps every living snake once, all at the same time, and returns the number of snakes that died.
+    #Tails leave their cells first, except for snakes about to eat, so a head can follow a tail. Then a head dies if it
+    #meets another head, or moves into any snake's body as it was before this tick's heads moved.
+    def step(self):
+        self.ticks += 1
+        alive = [snake for snake in self.snakes if snake.alive]
+        for snake in alive:
+            snake.turn(snake.controller.next_direction(snake))
+            snake.next = snake.next_cell()
+            snake.eats = self.food[snake.next] == 1
+        heads = {}
+        for snake in alive:
+            heads[snake.next] = heads.get(snake.next, 0) + 1
+            if not snake.eats:
+                self.vacate(snake.body.pop())
+        dead = []
+        for snake in alive:
+            if heads[snake.next] > 1:
+                dead.append(snake)
+            elif self.occupied[snake.next]:
+                dead.append(snake)
+                killer = self.snakes[self.owner[snake.next]]
+                if killer is not snake:
+                    killer.kills += 1
+        for snake in dead:
+            snake.alive = False
+        for snake in alive:
+            if not snake.alive:
+                continue
+            if snake.eats:
+                self.remove_food(snake.next)
+                self.occupied[snake.next] = 1
+                self.owner[snake.next] = snake.id
+                snake.eaten += 1
+            else:
+                self.occupy(snake.next, snake.id)
+            snake.body.appendleft(snake.next)
+        for snake in dead:
+            self.kill(snake)
+        self.top_up_food()
+        return len(dead)
+
+    #Takes a dead snake's body off the board, then puts the snake back on it if respawn is true.
+    def kill(self, snake):
+        for cell in snake.body:
+            self.vacate(cell)
+        snake.body.clear()
+        snake.deaths += 1
+        self.deaths += 1
+        if self.respawn:
+            self.place(snake)
+
+    def alive(self):
+        return sum(1 for snake in self.snakes if snake.alive)
+
+    def longest(self):
+        living = [snake for snake in self.snakes if snake.alive]
+        return max(living, key = lambda snake: snake.length) if living else None
+
+#Creates an arena with the given number of snakes, all steered by controllers of the named kind.
+def create_arena(snakes, cols, rows, food_count, controller = "greedy", seed = None):
+    if controller not in CONTROLLERS:
+        raise ValueError(f"Arena snakes can't be steered by {controller}, choose from " + ", ".join(CONTROLLERS) + ".")
+    arena = Arena(cols, rows, food_count, seed)
+    for i in range(snakes):
+        arena.add_snake(controllers.CONTROLLERS[controller](None if seed is None else seed + i))
+    return arena
+
+#Steps arenas of every given snake count and returns (snakes, milliseconds per tick, microseconds per snake tick).
+def benchmark(counts, cols, rows, ticks, controller, seed = 0):
+    results = []
+    for count in counts:
+        arena = create_arena(count, cols, rows, max(count, 10), controller, seed)
+        start = time.perf_counter()
+        for tick in range(ticks):
+            arena.step()
+        elapsed = time.perf_counter() - start
+        results.append((count, elapsed / ticks * 1000, elapsed / ticks / count * 1e6))
+    return results
+
+#Plays an arena in a game window, following its longest snake.
+def watch(arena, tick_rate):
+    import pygame                           #Only needed to draw the arena, the rest of this module runs headless.
+    import main
+    import assets
+    import camera
+    pygame.display.init()
+    pygame.display.set_caption("Snakery arena")
+    window = pygame.display.set_mode((main.WIDTH, main.HEIGHT))
+    view = camera.Camera(arena.cols, arena.rows, main.CELL, main.PLAY_AREA)
+    apple = assets.shared.image(assets.APPLE)
+    font = assets.shared.font(assets.JOKERMAN, main.FONT_SIZE)
+    clock = pygame.time.Clock()
+    followed = None
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                running = False
+        start = time.perf_counter()
+        arena.step()
+        tick_ms = (time.perf_counter() - start) * 1000
+        longest = arena.longest()
+        if longest is None:
+            break
+        col, row = arena.position(longest.head)
+        if longest is not followed:
+            followed = longest
+            view.center(col * main.CELL, row * main.CELL)
+        else:
+            view.follow(col * main.CELL, row * main.CELL)
+        window.fill(main.BLACK)
+        view.draw_background(window)
+        window.set_clip(view.view)
+        for rect in view.runs(arena.occupied):
+            window.fill(main.CYAN, rect)
+        for rect in view.runs(arena.food):
+            for x in range(rect.left, rect.right, main.CELL):
+                window.blit(apple, (x, rect.top))
+        for snake in arena.snakes:
+            if snake.alive and view.visible(snake.head):
+                window.fill(main.WHITE, view.rect(snake.head).clip(view.view))
+        window.set_clip(None)
+        text = f"Snakes: {arena.alive()}  Longest: {longest.length}  Tick: {tick_ms:.1f} ms"
+        font.render_to(window, (10, 15), text, main.CYAN)
+        pygame.display.flip()
+        clock.tick(tick_rate)
+    pygame.quit()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Step many scripted snakes on one board.")
+    parser.add_argument("--snakes", type = int, nargs = "+", default = [50, 100, 200, 400], help = "snake counts to time")
+    parser.add_argument("--cols", type = int, default = 300)
+    parser.add_argument("--rows", type = int, default = 300)
+    parser.add_argument("--ticks", type = int, default = 200, help = "ticks to time for each snake count")
+    parser.add_argument("--controller", default = "greedy", help = "controller steering every snake: " +
+                        ", ".join(CONTROLLERS))
+    parser.add_argument("--watch", action = "store_true", help = "play the first snake count in a window instead")
+    parser.add_argument("--tick-rate", type = int, default = 15, help = "ticks per second while watching")
+    args = parser.parse_args()
+    if args.controller not in CONTROLLERS:
+        parser.error(f"arena snakes can't be steered by {args.controller}, choose from " + ", ".join(CONTROLLERS))
+
+    if args.watch:
+        watch(create_arena(args.snakes[0], args.cols, args.rows, args.snakes[0], args.controller), args.tick_rate)
+        return
+    for snakes, tick_ms, snake_us in benchmark(args.snakes, args.cols, args.rows, args.ticks, args.controller):
+        print(f"{snakes:>6} snakes: {tick_ms:8.2f} ms/tick {snake_us:8.1f} us per snake tick")
+
+if __name__ == '__main__':
+    main()
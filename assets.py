@@ -0,0 +1,103 @@
+#Assets.py
+#Module to load the game's images, sounds and fonts.
+#Each resource is read from disk once, the first time it's asked for, and then served from memory for the rest of the program.
+
+import time
+
+import pygame
+import pygame.freetype
+
+import file
+
+#Paths of the game's resources, relative to the resource root found by file.locate_res.
+APPLE = "res/images/apple.jpg"
+SETTINGS_ICON = "res/images/SettingsIcon.png"
+SNAKE_ICON = "res/images/Snake.ico"
+BITE = "res/sounds/bite.wav"
+YOU_LOSE = "res/sounds/youlose.wav"
+JOKERMAN = "res/fonts/JOKERMAN.TTF"
+EIGHT_BIT = "res/fonts/8-BIT.ttf"
+
+#Caches loaded resources by key. The key of a sound is its path, the key of a font is its path and size, and the key of
+#an image is its path and whether it was converted, so an image loaded unconverted is never handed out as converted.
+#loads counts how many times each kind of resource was read from disk, and load_time holds the seconds spent doing so.
+#Images are converted to the display's pixel format when loaded, so blitting them doesn't convert them on every frame.
+#Converted images must be invalidated if the display mode changes.
+class Assets():
+    def __init__(self):
+        self.cache = {}
+        self.loads = dict(image = 0, sound = 0, font = 0)
+        self.load_time = dict(image = 0.0, sound = 0.0, font = 0.0)
+
+    #Returns the cached resource for key, calling loader to read it from disk the first time.
+    def get(self, kind, key, loader):
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        start = time.perf_counter()
+        resource = loader()
+        self.load_time[kind] += time.perf_counter() - start
+        self.loads[kind] += 1
+        self.cache[key] = resource
+        return resource
+
+    #Returns an image, converted to the display's pixel format (keeping transparency) if a display mode is set.
+    #Images used before the display exists, such as the window icon, can be loaded with convert set to false.
+    def image(self, path, convert = True):
+        convert = convert and pygame.display.get_surface() is not None
+
+        def load():
+            surface = pygame.image.load(file.locate_res(path))
+            if convert:
+                if surface.get_flags() & pygame.SRCALPHA:
+                    return surface.convert_alpha()
+                return surface.convert()
+            return surface
+        return self.get("image", (path, convert), load)
+
+    #Returns a sound, or None if the mixer isn't running, as when there's no audio device.
+    def sound(self, path):
+        if not pygame.mixer.get_init():
+            return None
+        return self.get("sound", path, lambda: pygame.mixer.Sound(file.locate_res(path)))
+
+    #Fonts are drawn with freetype, which is only started when the first font is loaded.
+    def font(self, path, size):
+        def load():
+            if not pygame.freetype.get_init():
+                pygame.freetype.init()
+            return pygame.freetype.Font(file.locate_res(path), size)
+        return self.get("font", (path, size), load)
+
+    #Loads every given path up front, so the first frame that uses them doesn't have to wait on the disk.
+    #Fonts are given as (path, size) pairs.
+    def preload(self, images = (), sounds = (), fonts = ()):
+        for path in images:
+            self.image(path)
+        for path in sounds:
+            self.sound(path)
+        for path, size in fonts:
+            self.font(path, size)
+
+    #Forgets a cached resource, or every cached resource if no key is given, so it's read from disk again on next use.
+    def invalidate(self, key = None):
+        if key is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(key, None)
+
+    #Total number of resources read from disk so far.
+    #Comparing this before and after the game loop shows whether the loop touched the disk.
+    def load_count(self):
+        return sum(self.loads.values())
+
+    #Summary of how many resources of each kind were loaded and how long loading them took.
+    def report(self):
+        lines = []
+        for kind, count in self.loads.items():
+            lines.append(f"{kind}: {count} loaded in {self.load_time[kind] * 1000:.2f} ms")
+        return "\n".join(lines)
+
+#Cache shared by the whole game.
+shared = Assets()
@@ -0,0 +1,118 @@
+#Batch.py
+#Steps many independent games at once with numpy, for training bots and testing the game's balance.
+#Each board is a row of the batch's arrays, and every step applies the same rules as engine.Engine to all boards together.
+#Run this module to print the throughput for a range of batch sizes.
+
+import sys
+import time
+
+import numpy
+
+import engine
+
+#Directions in the order used by actions, an action of -1 keeps the current direction.
+DIRECTIONS = (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+DX = numpy.array([d[0] for d in DIRECTIONS])
+DY = numpy.array([d[1] for d in DIRECTIONS])
+OPPOSITE = numpy.array([DIRECTIONS.index(engine.OPPOSITE[d]) for d in DIRECTIONS])
+
+#Holds n boards of cols * rows cells.
+#ring holds each board's body as a ring buffer with room for a snake covering the whole board, the head is at ring[b, start[b]]
+#and the following length[b] - 1 entries are the rest of the body. occupied is one byte per cell, like in engine.Engine.
+#Boards that die or fill up are reset on the same step, and their final length is added to finished.
+class BatchEngine():
+    def __init__(self, n, cols, rows, length = 5, seed = None):
+        self.n = n
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        self.start_length = length
+        self.rng = numpy.random.default_rng(seed)
+        self.boards = numpy.arange(n)
+        self.ring = numpy.zeros((n, self.size), dtype = numpy.int32)
+        self.occupied = numpy.zeros((n, self.size), dtype = numpy.uint8)
+        self.start = numpy.zeros(n, dtype = numpy.int64)
+        self.length = numpy.zeros(n, dtype = numpy.int64)
+        self.head = numpy.zeros(n, dtype = numpy.int64)
+        self.direction = numpy.zeros(n, dtype = numpy.int64)
+        self.food = numpy.zeros(n, dtype = numpy.int64)
+        self.ticks = numpy.zeros(n, dtype = numpy.int64)
+        self.finished = []                          #Lengths reached by every game that ended, in the order they ended.
+        col, row = cols // 2, rows // 2
+        self.start_body = numpy.array([(row % rows) * cols + (col - i) % cols for i in range(length)], dtype = numpy.int32)
+        self.reset(self.boards)
+
+    #Puts the given boards back to the start of a game, with a snake heading right in the middle of the board.
+    def reset(self, boards):
+        if len(boards) == 0:
+            return
+        self.occupied[boards] = 0
+        self.ring[boards, :self.start_length] = self.start_body
+        self.occupied[boards[:, None], self.start_body[None, :]] = 1
+        self.start[boards] = 0
+        self.length[boards] = self.start_length
+        self.head[boards] = self.start_body[0]
+        self.direction[boards] = DIRECTIONS.index(engine.RIGHT)
+        self.ticks[boards] = 0
+        self.spawn_food(boards)
+
+    #Places food uniformly on a free cell of each given board, by picking the k-th free cell for a random k.
+    #Returns a mask of the boards that have no free cell left.
+    def spawn_food(self, boards):
+        free = self.occupied[boards] == 0
+        counts = free.sum(axis = 1)
+        k = (self.rng.random(len(boards)) * counts).astype(numpy.int64)
+        cells = (free.cumsum(axis = 1) <= k[:, None]).sum(axis = 1)
+        full = counts == 0
+        self.food[boards] = numpy.where(full, -1, cells)
+        return full
+
+    #Advances every board by one tick, actions holds an index into DIRECTIONS (or -1) for each board.
+    #Returns the outcome of each board as engine.MOVED, ATE, DIED or WON. Boards that died or won have already been reset.
+    def step(self, actions = None):
+        if actions is not None:
+            actions = numpy.asarray(actions)
+            turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+            self.direction = numpy.where(turn, actions, self.direction)
+        col = self.head % self.cols + DX[self.direction]
+        row = self.head // self.cols + DY[self.direction]
+        new_head = (row % self.rows) * self.cols + col % self.cols
+        ate = new_head == self.food
+        tail_slot = (self.start + self.length - 1) % self.size
+        moving = self.boards[~ate]
+        self.occupied[moving, self.ring[moving, tail_slot[moving]]] = 0
+        died = self.occupied[self.boards, new_head] == 1
+        alive = self.boards[~died]
+        self.start[alive] = (self.start[alive] - 1) % self.size
+        self.ring[alive, self.start[alive]] = new_head[alive]
+        self.occupied[alive, new_head[alive]] = 1
+        self.head[alive] = new_head[alive]
+        self.length[alive] += ate[alive]
+        self.ticks[alive] += 1
+        outcomes = numpy.where(ate, engine.ATE, engine.MOVED)
+        outcomes[died] = engine.DIED
+        eaten = self.boards[ate & ~died]
+        full = eaten[self.spawn_food(eaten)]
+        outcomes[full] = engine.WON
+        ended = self.boards[died | (outcomes == engine.WON)]
+        self.finished.extend(self.length[ended].tolist())
+        self.reset(ended)
+        return outcomes
+
+#Steps batches of random players and returns a list of (batch size, board ticks per second) pairs.
+def benchmark(batch_sizes = (1, 16, 256, 4096), ticks = 200, cols = 50, rows = 35, seed = 0):
+    results = []
+    for n in batch_sizes:
+        batch = BatchEngine(n, cols, rows, seed = seed)
+        actions = batch.rng.integers(-1, 4, size = (ticks, n))
+        start = time.perf_counter()
+        for tick in range(ticks):
+            batch.step(actions[tick])
+        elapsed = time.perf_counter() - start
+        results.append((n, n * ticks / elapsed))
+    return results
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1, 16, 256, 4096]
+    for n, rate in benchmark(sizes):
+        print(f"{n:>6} boards: {rate:>14,.0f} board ticks/sec")
@@ -0,0 +1,205 @@
+#Bench.py
+#Benchmarks the game's hot paths: stepping the snake (slither and grow), the collision check, placing food, forking
+#lookahead states and rendering.
+#Runs under SDL's dummy video and audio drivers, so no display is needed.
+#Results are printed and saved as JSON, and can be compared against an earlier run to spot regressions.
+#Example: python bench.py --out bench.json --compare last.json
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")      #Must be set before pygame is imported.
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import engine
+import controllers
+import state
+
+BOARDS = ((50, 35), (200, 200), (1000, 1000))
+LENGTHS = (5, 100, 1000, 10000)
+
+#Creates an engine with a snake of the given length lying along the board's hamiltonian cycle, with no food.
+#Stepping it along the cycle never dies, so the snake's length stays the same for as long as the benchmark runs.
+def create_game(cols, rows, length):
+    game = engine.Engine(cols, rows)
+    cycle = controllers.hamiltonian_cycle(cols, rows)
+    cells = [0]
+    for i in range(length - 1):
+        col, row = game.position(cells[-1])
+        direction = cycle[cells[-1]]
+        cells.append(game.cell(col + direction[0], row + direction[1]))
+    cells.reverse()
+    game.place(cells, cycle[cells[1]], None)
+    return game, cycle
+
+#Times calls of op and returns the nanoseconds per call, repeating until at least min_time seconds have passed.
+def time_op(op, min_time):
+    count = 1
+    while True:
+        start = time.perf_counter_ns()
+        for i in range(count):
+            op()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            return elapsed / count
+        count *= 2
+
+#Runs op a fixed number of times with tracemalloc on and returns the blocks left allocated and the peak traced bytes.
+def memory_op(op, calls):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    blocks = sys.getallocatedblocks()
+    for i in range(calls):
+        op()
+    net_blocks = sys.getallocatedblocks() - blocks
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return net_blocks, peak
+
+#Measures one operation, the setup function returns a fresh op so that timing and memory runs start from the same state.
+def measure(name, board, length, setup, min_time):
+    ns = time_op(setup(), min_time)
+    net_blocks, peak = memory_op(setup(), 1000)
+    result = dict(name = name, board = f"{board[0]}x{board[1]}", length = length, ns_per_op = round(ns, 1),
+                  ops_per_sec = round(1e9 / ns), net_blocks = net_blocks, peak_bytes = peak)
+    print(f"{name:>14} {result['board']:>10} length {length:>6}: {ns:>12,.0f} ns/op {result['ops_per_sec']:>12,} ops/sec "
+          f"{net_blocks:>6} blocks {peak:>10,} peak bytes")
+    return result
+
+#Moving the snake one cell along the cycle: the head is pushed and the tail popped.
+def slither(cols, rows, length):
+    game, cycle = create_game(cols, rows, length)
+    def op():
+        game.step(cycle[game.head])
+    return op
+
+#Eating food placed right in front of the head, then placing the next food.
+#Once the snake has grown by up to 1000 parts its tail is cut back, so the sweep keeps measuring roughly the given length.
+def grow(cols, rows, length):
+    game, cycle = create_game(cols, rows, length)
+    limit = length + max(1, min(1000, (cols * rows - length) // 2))
+    def op():
+        if game.length >= limit:
+            while game.length > length:
+                game.vacate(game.body.pop())
+        game.food = controllers.neighbour(game, game.head, cycle[game.head])
+        game.step(cycle[game.head])
+    return op
+
+#Checking whether the head's next cell would kill the snake.
+def collision(cols, rows, length):
+    game, cycle = create_game(cols, rows, length)
+    def op():
+        game.occupied[game.next_cell()]
+    return op
+
+def spawn_food(cols, rows, length):
+    game, cycle = create_game(cols, rows, length)
+    return game.spawn_food
+
+#Forking a lookahead state and stepping the fork once, as a search does for every node it expands.
+def clone_step(cols, rows, length):
+    game, cycle = create_game(cols, rows, length)
+    root = state.State(game.snapshot())
+    def op():
+        fork = root.clone()
+        fork.step(cycle[fork.head])
+    return op
+
+#Runs the engine benchmarks for every board and length, skipping snakes longer than half their board.
+def engine_benchmarks(boards, lengths, min_time):
+    results = []
+    for board in boards:
+        for length in lengths:
+            if length > board[0] * board[1] // 2:
+                continue
+            for name, setup in (("slither", slither), ("grow", grow), ("collision", collision), ("spawn_food", spawn_food),
+                                ("clone_step", clone_step)):
+                results.append(measure(name, board, length, lambda: setup(board[0], board[1], length), min_time))
+    return results
+
+#Runs the rendering benchmarks in the game window for every board and length, skipping snakes longer than half their board.
+#The window shows the same number of cells on every board, so these times shouldn't grow with the board or the snake.
+#The games' stats are saved in a temporary folder, not among the player's own.
+def render_benchmarks(boards, lengths, min_time):
+    import pygame                   #Imported here so the engine benchmarks can run without pygame installed.
+    import main
+    results = []
+    folder = tempfile.TemporaryDirectory()
+    for board in boards:
+        game = main.Game(cols = board[0], rows = board[1], save_location = folder.name)
+        for length in lengths:
+            if length > board[0] * board[1] // 2:
+                continue
+            def setup_game():
+                test_game, cycle = create_game(board[0], board[1], length)
+                game.engine.place(test_game.body, test_game.direction, None)
+                game.engine.spawn_food()
+                game.camera.center(*game.head_position())
+                game.redraw = True
+                return cycle
+            def snake_render():
+                setup_game()
+                return lambda: game.snake.render(game.window)
+            def full_render():
+                setup_game()
+                game.full_redraw = True
+                return game.render
+            def dirty_render():
+                cycle = setup_game()
+                game.full_redraw = False
+                game.render()
+                def op():
+                    game.engine.step(cycle[game.engine.head])
+                    game.mark_dirty()
+                    game.render()
+                return op
+            results.append(measure("snake_render", board, length, snake_render, min_time))
+            results.append(measure("full_render", board, length, full_render, min_time))
+            results.append(measure("dirty_tick", board, length, dirty_render, min_time))
+        game.stats.close()
+    folder.cleanup()
+    pygame.quit()
+    return results
+
+#Prints how each result changed against a previous run, matching results by name, board and length.
+def compare(results, path):
+    with open(path) as reader:
+        previous = json.load(reader)["results"]
+    old = {(r["name"], r["board"], r["length"]): r for r in previous}
+    print(f"\nCompared with {path}:")
+    for result in results:
+        key = (result["name"], result["board"], result["length"])
+        if key in old:
+            change = (result["ns_per_op"] - old[key]["ns_per_op"]) / old[key]["ns_per_op"] * 100
+            print(f"{key[0]:>14} {key[1]:>10} length {key[2]:>6}: {change:+7.1f}% ns/op")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the game's hot paths.")
+    parser.add_argument("--out", default = "bench.json", help = "file to save the results to")
+    parser.add_argument("--compare", metavar = "JSON", help = "earlier results to compare against")
+    parser.add_argument("--min-time", type = float, default = 0.2, help = "seconds to spend timing each benchmark")
+    parser.add_argument("--quick", action = "store_true", help = "only use the game's own board and short snakes")
+    parser.add_argument("--no-render", action = "store_true", help = "skip the rendering benchmarks")
+    args = parser.parse_args()
+
+    boards = BOARDS[:1] if args.quick else BOARDS
+    lengths = LENGTHS[:2] if args.quick else LENGTHS
+    results = engine_benchmarks(boards, lengths, args.min_time)
+    if not args.no_render:
+        results += render_benchmarks(boards, lengths, args.min_time)
+    meta = dict(python = platform.python_version(), platform = platform.platform(), time = time.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(args.out, "w") as writer:
+        json.dump(dict(meta = meta, results = results), writer, indent = 1)
+    print(f"Saved {len(results)} results to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
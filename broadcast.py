@@ -0,0 +1,358 @@
+#Broadcast.py
+#Streams the game being played to viewers in other processes, over a localhost TCP port or a Unix socket, so soak tests
+#and bot games can be watched without drawing them in the process that plays them.
+#The game only appends each tick's changes to a queue; an asyncio server on its own thread packs them into small binary
+#frames and writes them to every viewer. A viewer too slow to keep up has its socket buffer fill until asyncio pauses
+#writing to it. Its frames are then dropped instead of queued, and once it catches up it gets a single keyframe of the
+#game as it is by then, so a slow viewer costs the game nothing and never holds up the others.
+#Example: python main.py --serve 127.0.0.1:7777, then python broadcast.py 127.0.0.1:7777
+#
+#Frames, all integers little endian, each starting with its kind:
+#   keyframe:  tick, cols, rows, food (-1 if none), best length, length, then the body's cells from head to tail.
+#              Sent to a viewer when it connects, when it catches up after frames were dropped, and when a game starts.
+#   step:      tick, the cell the head moved into, the cell the tail left (-1 if the snake grew).
+#   food:      tick, the cell the food was placed on (-1 if none).
+#   best:      tick, best length.
+#   end:       tick, outcome of the game's last step (engine.DIED or engine.WON).
+
+import argparse
+import asyncio
+import socket
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import deque
+
+import engine
+
+KEYFRAME = 1
+STEP = 2
+FOOD = 3
+BEST = 4
+END = 5
+FRAMES = {KEYFRAME: struct.Struct("<BIHHiII"), STEP: struct.Struct("<BIIi"), FOOD: struct.Struct("<BIi"),
+          BEST: struct.Struct("<BII"), END: struct.Struct("<BIB")}
+NONE = -1
+HIGH_WATER = 64 * 1024              #Bytes waiting to be sent to a viewer before it stops being sent frames.
+DEFAULT_ADDRESS = "127.0.0.1:7777"
+
+#Splits an address into a (host, port) pair, or a path for addresses of the form unix:PATH.
+def parse_address(address):
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+#Applies a step frame to an engine standing in for the game being watched.
+#The tail leaves its cell before the head arrives, as in engine.Engine.step, since the head may be following the tail.
+def apply_step(game, tick, head, vacated):
+    game.direction = game.direction_between(game.head, head)
+    game.vacated = None if vacated == NONE else vacated
+    if vacated != NONE:
+        game.body.pop()
+        game.vacate(vacated)
+    game.body.appendleft(head)
+    game.occupy(head)
+    game.ticks = tick
+
+#Reads frames out of a stream of bytes and applies them to an engine, which holds the game as the viewer last saw it.
+#The engine is made by the first keyframe, and made again by any keyframe of a board of another size.
+#If given, on_frame is called with the kind of every frame once it's applied.
+class Spectator():
+    def __init__(self, on_frame = None):
+        self.on_frame = on_frame
+        self.buffer = bytearray()
+        self.game = None
+        self.best = 0
+        self.outcome = None         #How the last game ended, None while a game is being played.
+        self.frames = 0
+        self.keyframes = 0
+        self.received = 0
+
+    def feed(self, data):
+        self.buffer += data
+        self.received += len(data)
+        offset = 0
+        while offset < len(self.buffer):
+            kind = self.buffer[offset]
+            frame = FRAMES.get(kind)
+            if frame is None:
+                raise ValueError(f"Unknown frame kind {kind}.")
+            if offset + frame.size > len(self.buffer):
+                break
+            fields = frame.unpack_from(self.buffer, offset)
+            end = offset + frame.size + (4 * fields[-1] if kind == KEYFRAME else 0)
+            if end > len(self.buffer):
+                break
+            self.apply(kind, fields, self.buffer[offset + frame.size:end])
+            offset = end
+        del self.buffer[:offset]
+
+    def apply(self, kind, fields, cells):
+        self.frames += 1
+        if kind == KEYFRAME:
+            self.keyframe(*fields[1:], array("I", cells))
+        elif kind == STEP:
+            apply_step(self.game, *fields[1:])
+        elif kind == FOOD:
+            self.game.food = None if fields[2] == NONE else fields[2]
+        elif kind == BEST:
+            self.best = fields[2]
+        elif kind == END:
+            self.outcome = fields[2]
+        if self.on_frame is not None:
+            self.on_frame(kind)
+
+    def keyframe(self, tick, cols, rows, food, best, length, body):
+        self.keyframes += 1
+        if self.game is None or (self.game.cols, self.game.rows) != (cols, rows):
+            self.game = engine.Engine(cols, rows)
+        direction = self.game.direction_between(body[1], body[0]) if length > 1 else engine.RIGHT
+        self.game.place(body, direction, None if food == NONE else food, tick)
+        self.best = best
+        self.outcome = None
+
+#Packs a keyframe of the game an engine holds.
+def pack_keyframe(game, best):
+    food = NONE if game.food is None else game.food
+    header = FRAMES[KEYFRAME].pack(KEYFRAME, game.ticks, game.cols, game.rows, food, best, game.length)
+    return header + array("I", game.body).tobytes()
+
+#One connected viewer.
+#asyncio calls pause_writing once more than high_water bytes are waiting to be sent, and resume_writing once they've
+#mostly been sent.
+class Viewer(asyncio.Protocol):
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.transport = None
+        self.paused = False
+        self.stale = False          #True if frames were dropped while paused.
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high = self.broadcaster.high_water)
+        self.broadcaster.viewers.add(self)
+        if self.broadcaster.mirror.game is not None:
+            transport.write(self.broadcaster.keyframe())
+
+    def connection_lost(self, error):
+        self.broadcaster.viewers.discard(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        if self.stale:
+            self.stale = False
+            self.transport.write(self.broadcaster.keyframe())
+
+    def send(self, data):
+        if self.paused:
+            self.stale = True
+            self.dropped += 1
+        else:
+            self.transport.write(data)
+
+#Serves the game to viewers from a thread of its own.
+#The methods called by the game (new_game, step, food and close) only queue what changed, everything else runs on the
+#server's thread. The server keeps its own copy of the game, built from the frames it sends, to make keyframes from.
+class Broadcaster():
+    def __init__(self, address = DEFAULT_ADDRESS, high_water = HIGH_WATER):
+        self.address = address
+        self.target = parse_address(address)
+        self.high_water = high_water
+        self.events = deque()
+        self.scheduled = False
+        self.viewers = set()
+        self.mirror = Spectator()
+        self.best = 0               #The best length last queued, only used by the game's thread.
+        self.sent = 0               #Frames packed since the server started.
+        self.error = None
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target = self.run, name = "broadcast", daemon = True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    #Body of the server's thread.
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            if isinstance(self.target, str):
+                server = self.loop.run_until_complete(self.loop.create_unix_server(lambda: Viewer(self), self.target))
+            else:
+                server = self.loop.run_until_complete(self.loop.create_server(lambda: Viewer(self), *self.target))
+        except OSError as error:
+            self.error = error
+            self.ready.set()
+            return
+        self.ready.set()
+        self.loop.run_forever()
+        for viewer in list(self.viewers):
+            viewer.transport.abort()            #Viewers still behind are cut off rather than waited for.
+        server.close()
+        self.loop.run_until_complete(server.wait_closed())
+        self.loop.close()
+
+    #Queues a change from the game's thread, waking the server if it isn't already due to send what's queued.
+    def publish(self, event):
+        self.events.append(event)
+        if not self.scheduled:
+            self.scheduled = True
+            self.loop.call_soon_threadsafe(self.flush)
+
+    def new_game(self, game, best):
+        self.best = best
+        self.publish((KEYFRAME, game.ticks, game.cols, game.rows, game.food, best, array("I", game.body)))
+
+    #Queues the changes made by the game's last step, called after every step with its outcome.
+    #A winning step is sent like any other before the game's end, a step the snake died on moved nothing.
+    def step(self, game, outcome, best):
+        if outcome != engine.DIED:
+            self.publish((STEP, game.ticks, game.head, NONE if game.vacated is None else game.vacated))
+            if outcome == engine.ATE or outcome == engine.WON:
+                self.food(game)
+            if best != self.best:
+                self.best = best
+                self.publish((BEST, game.ticks, best))
+        if outcome == engine.DIED or outcome == engine.WON:
+            self.publish((END, game.ticks, outcome))
+
+    def food(self, game):
+        self.publish((FOOD, game.ticks, NONE if game.food is None else game.food))
+
+    #Packs everything queued into frames, applies them to the server's copy of the game and sends them to every viewer.
+    def flush(self):
+        self.scheduled = False
+        frames = []
+        while self.events:
+            event = self.events.popleft()
+            kind = event[0]
+            if kind == KEYFRAME:
+                *fields, body = event
+                fields[4] = NONE if fields[4] is None else fields[4]
+                frame = FRAMES[KEYFRAME].pack(*fields, len(body)) + body.tobytes()
+            else:
+                frame = FRAMES[kind].pack(*event)
+            self.mirror.feed(frame)
+            frames.append(frame)
+        self.sent += len(frames)
+        if frames and self.viewers:
+            data = b"".join(frames)
+            for viewer in list(self.viewers):
+                viewer.send(data)
+
+    def keyframe(self):
+        return pack_keyframe(self.mirror.game, self.mirror.best)
+
+    #Sends what's queued, then stops the server and disconnects every viewer.
+    def close(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.flush)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+#Connects to a broadcasting game, returning a blocking socket.
+def connect(address):
+    target = parse_address(address)
+    if isinstance(target, str):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(target)
+        return connection
+    return socket.create_connection(target)
+
+#Prints what a broadcast carries once a second, reading it delay_ms after each read to act as a slow viewer if given.
+def print_stats(address, delay_ms = 0):
+    connection = connect(address)
+    spectator = Spectator()
+    last = time.perf_counter()
+    frames = 0
+    while True:
+        data = connection.recv(1 << 16)
+        if not data:
+            break
+        spectator.feed(data)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        now = time.perf_counter()
+        if now - last >= 1 and spectator.game is not None:
+            game = spectator.game
+            print(f"tick {game.ticks:>8}  length {game.length:>6}  best {spectator.best:>6}  "
+                  f"{(spectator.frames - frames) / (now - last):8.0f} frames/s  keyframes {spectator.keyframes:>5}  "
+                  f"{spectator.received / 1024:10.1f} KiB")
+            last = now
+            frames = spectator.frames
+    connection.close()
+
+#Draws a broadcasting game in a game window, with the game's own renderer.
+#The best length shown is the broadcaster's, the window's own stats are kept in a temporary folder and thrown away.
+def watch(address):
+    import pygame                           #Only needed to draw the game, the rest of this module runs headless.
+    import main
+    folder = tempfile.TemporaryDirectory()
+    connection = connect(address)
+    connection.setblocking(False)
+    view = None
+
+    def on_frame(kind):
+        if view is None:
+            return
+        if kind == STEP:
+            view.mark_dirty()
+        elif kind == KEYFRAME:
+            view.redraw = True
+
+    spectator = Spectator(on_frame)
+    running = True
+    while running:
+        try:
+            data = connection.recv(1 << 16)
+            if not data:
+                break
+            spectator.feed(data)
+        except BlockingIOError:
+            pass
+        game = spectator.game
+        if game is None:
+            time.sleep(0.01)
+            continue
+        if view is None or (view.engine.cols, view.engine.rows) != (game.cols, game.rows):
+            if view is not None:
+                view.stats.close()
+            view = main.Game(cols = game.cols, rows = game.rows, save_location = folder.name)
+        if view.engine is not game:
+            view.engine = game
+            view.snake.engine = game
+            view.snake.head.engine = game
+            view.camera.center(*view.head_position())
+            view.redraw = True
+        view.highscore = spectator.best
+        view.handle_events()
+        running = view.running
+        view.render()
+        view.clock.tick(main.FPS)
+    connection.close()
+    if view is not None:
+        view.stats.close()
+    folder.cleanup()
+    pygame.quit()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Watch a game broadcast by python main.py --serve.")
+    parser.add_argument("address", nargs = "?", default = DEFAULT_ADDRESS, help = "HOST:PORT or unix:PATH")
+    parser.add_argument("--stats", action = "store_true", help = "print what the broadcast carries instead of drawing it")
+    parser.add_argument("--delay", type = int, default = 0, help = "milliseconds to wait after each read, with --stats")
+    args = parser.parse_args()
+    if args.stats:
+        print_stats(args.address, args.delay)
+    else:
+        watch(args.address)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#Camera.py
+#Maps the cells of a board of any size onto the part of the window the board is drawn in, its view, and scrolls the view
+#to follow the snake on boards too big to fit in it.
+#The board wraps around its edges, so the view can show the last columns or rows of the board next to the first ones.
+#Only what's inside the view is ever drawn: the snake is found by scanning the visible rows of the engine's occupancy,
+#and the background comes from a few cached chunk surfaces, so a frame costs the same on any board with any snake.
+
+import pygame
+
+CHUNK = 32                  #Width and height, in cells, of the background chunks.
+BACKGROUND = (0, 0, 0)
+EDGE = (60, 60, 60)         #Color of the lines marking where a scrolling board wraps around.
+
+#Positions of the board are in pixels, with the board's top left cell at (0, 0).
+#x and y are the position of the board shown at the view's top left corner, they only change on axes the board scrolls on.
+#The head is kept at least a third of the view away from its edges, the view scrolls when the head goes past that.
+class Camera():
+    def __init__(self, cols, rows, cell, area):
+        self.cols = cols
+        self.rows = rows
+        self.cell = cell
+        self.board_width = cols * cell
+        self.board_height = rows * cell
+        self.view = pygame.Rect(0, 0, min(area.width, self.board_width), min(area.height, self.board_height))
+        self.view.center = area.center                  #Boards smaller than the area are drawn in its middle.
+        self.scrolls_x = self.board_width > self.view.width
+        self.scrolls_y = self.board_height > self.view.height
+        self.x = 0
+        self.y = 0
+        self.chunks = {}                                #Background chunk surfaces, keyed by their size and edges.
+
+    #Moves the view so the given position is in its middle.
+    def center(self, x, y):
+        if self.scrolls_x:
+            self.x = (x + self.cell // 2 - self.view.width // 2) % self.board_width
+        if self.scrolls_y:
+            self.y = (y + self.cell // 2 - self.view.height // 2) % self.board_height
+
+    #Scrolls the view just enough to keep the given position away from its edges, returns true if the view moved.
+    def follow(self, x, y):
+        old = (self.x, self.y)
+        if self.scrolls_x:
+            self.x = self.track(self.x, x, self.view.width, self.board_width)
+        if self.scrolls_y:
+            self.y = self.track(self.y, y, self.view.height, self.board_height)
+        return (self.x, self.y) != old
+
+    #Returns the offset along one axis that keeps pos within the middle third of the view.
+    #The position is measured from the view's middle, the short way around the board, so the view never jumps to the
+    #other side of the board when the head wraps around an edge.
+    def track(self, offset, pos, view, board):
+        margin = view // 3
+        shown = (pos - offset - view // 2 + board // 2) % board - board // 2 + view // 2
+        if shown < margin:
+            return (pos - margin) % board
+        if shown > view - margin - self.cell:
+            return (pos - view + margin + self.cell) % board
+        return offset
+
+    #Converts a column and row to the window position of their cell's top left corner.
+    #A cell cut by the view's left or top edge gets a position left of or above the view.
+    def screen_position(self, col, row):
+        x = (col * self.cell - self.x) % self.board_width
+        if x > self.board_width - self.cell:
+            x -= self.board_width
+        y = (row * self.cell - self.y) % self.board_height
+        if y > self.board_height - self.cell:
+            y -= self.board_height
+        return self.view.left + x, self.view.top + y
+
+    #The rect an engine cell covers on the window, which may be outside the view.
+    def rect(self, cell):
+        row, col = divmod(cell, self.cols)
+        x, y = self.screen_position(col, row)
+        return pygame.Rect(x, y, self.cell, self.cell)
+
+    #Returns true if any part of the cell is inside the view.
+    def visible(self, cell):
+        return self.view.colliderect(self.rect(cell))
+
+    #Returns the first visible column or row along one axis and how many columns or rows are visible.
+    def span(self, offset, view, count):
+        return offset // self.cell, min(count, (offset % self.cell + view + self.cell - 1) // self.cell)
+
+    #Returns the visible columns or rows as ranges of the board, two ranges if the view is cut by the board's edge.
+    def ranges(self, offset, view, count):
+        first, visible = self.span(offset, view, count)
+        if first + visible <= count:
+            return [range(first, first + visible)]
+        return [range(first, count), range(0, first + visible - count)]
+
+    #Yields the window rects of every run of occupied cells in the view, going along the visible rows.
+    #Each run of neighbouring occupied cells in a row comes as a single rect. The skipped cell, if any, is left out.
+    def runs(self, occupied, skip = None):
+        columns = self.ranges(self.x, self.view.width, self.cols)
+        for rows in self.ranges(self.y, self.view.height, self.rows):
+            for row in rows:
+                base = row * self.cols
+                for span in columns:
+                    start = base + span.start
+                    end = base + span.stop
+                    while True:
+                        first = occupied.find(1, start, end)
+                        if first == -1:
+                            break
+                        last = occupied.find(0, first, end)
+                        if last == -1:
+                            last = end
+                        start = last
+                        if skip is not None and first <= skip < last:
+                            if first < skip:
+                                yield self.run_rect(first, skip, base, row)
+                            first = skip + 1
+                        if first < last:
+                            yield self.run_rect(first, last, base, row)
+
+    #The rect covered by the cells from first up to last of a row, clipped to the view.
+    def run_rect(self, first, last, base, row):
+        x, y = self.screen_position(first - base, row)
+        return pygame.Rect(x, y, (last - first) * self.cell, self.cell).clip(self.view)
+
+    #Returns the engine cells with any part under the given window rect, only counting what's inside the view.
+    def cells_in(self, rect):
+        rect = rect.clip(self.view)
+        cells = set()
+        if not rect:
+            return cells
+        left = rect.left - self.view.left + self.x
+        top = rect.top - self.view.top + self.y
+        first_col, cols = self.span(left, rect.width, self.cols)
+        first_row, rows = self.span(top, rect.height, self.rows)
+        for row in range(first_row, first_row + rows):
+            for col in range(first_col, first_col + cols):
+                cells.add(row % self.rows * self.cols + col % self.cols)
+        return cells
+
+    #Returns the surface of the background chunk at the given chunk column and row.
+    #Chunks only differ in size, at the board's last column and row, and in whether they hold the lines marking the
+    #board's edges, so a handful of surfaces are shared by every chunk of the board.
+    def chunk(self, chunk_col, chunk_row):
+        width = min(CHUNK, self.cols - chunk_col * CHUNK)
+        height = min(CHUNK, self.rows - chunk_row * CHUNK)
+        left_edge = self.scrolls_x and chunk_col == 0
+        top_edge = self.scrolls_y and chunk_row == 0
+        key = (width, height, left_edge, top_edge)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = pygame.Surface((width * self.cell, height * self.cell)).convert()
+            surface.fill(BACKGROUND)
+            if left_edge:
+                pygame.draw.line(surface, EDGE, (0, 0), (0, height * self.cell - 1))
+            if top_edge:
+                pygame.draw.line(surface, EDGE, (0, 0), (width * self.cell - 1, 0))
+            self.chunks[key] = surface
+        return surface
+
+    #Draws the background of the whole view from its chunks.
+    def draw_background(self, window):
+        window.set_clip(self.view)
+        chunk_size = CHUNK * self.cell
+        y = self.view.top - self.y % chunk_size
+        chunk_row = self.y // chunk_size
+        while y < self.view.bottom:
+            x = self.view.left - self.x % chunk_size
+            chunk_col = self.x // chunk_size
+            while x < self.view.right:
+                surface = self.chunk(chunk_col, chunk_row)
+                window.blit(surface, (x, y))
+                x += surface.get_width()
+                chunk_col = (chunk_col + 1) % -(-self.cols // CHUNK)
+            y += surface.get_height()
+            chunk_row = (chunk_row + 1) % -(-self.rows // CHUNK)
+        window.set_clip(None)
+
+    #Draws the background of a single cell over it and returns the cell's rect.
+    def erase(self, window, cell):
+        row, col = divmod(cell, self.cols)
+        rect = self.rect(cell)
+        area = pygame.Rect(col % CHUNK * self.cell, row % CHUNK * self.cell, self.cell, self.cell)
+        window.blit(self.chunk(col // CHUNK, row // CHUNK), rect, area)
+        return rect
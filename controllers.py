@@ -0,0 +1,435 @@
+#Controllers.py
+#Scripted players that steer an engine.Engine in place of the keyboard.
+#Each controller's next_direction method looks at the engine and returns the direction to turn to, or None to keep going.
+
+import heapq
+import random
+from array import array
+from collections import deque
+
+import engine
+import profiler
+
+DIRECTIONS = (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+
+#Returns the cell a step in the given direction from cell leads to.
+def neighbour(game, cell, direction):
+    col, row = game.position(cell)
+    return game.cell(col + direction[0], row + direction[1])
+
+#Returns true if the head can move into cell on the next step without dying.
+#The tail always leaves its cell on that step, since food is never placed under the snake.
+def is_safe(game, cell):
+    return not game.occupied[cell] or cell == game.body[-1]
+
+#Directions the snake can take on the next step without dying, the reverse of the current direction is never allowed.
+def safe_directions(game):
+    return [d for d in DIRECTIONS if d != engine.OPPOSITE[game.direction] and is_safe(game, neighbour(game, game.head, d))]
+
+#Number of steps between two cells, going around the edges of the board if that's shorter.
+def distance(game, a, b):
+    a_col, a_row = game.position(a)
+    b_col, b_row = game.position(b)
+    dx = abs(a_col - b_col)
+    dy = abs(a_row - b_row)
+    return min(dx, game.cols - dx) + min(dy, game.rows - dy)
+
+#Turns randomly, avoiding instant death when it can.
+class RandomController():
+    def __init__(self, seed = None):
+        self.rng = random.Random(seed)
+
+    def reset(self, game):
+        pass
+
+    def next_direction(self, game):
+        options = safe_directions(game)
+        return self.rng.choice(options) if options else None
+
+#Takes whichever safe step brings the head closest to the food.
+class GreedyController():
+    def __init__(self, seed = None):
+        pass
+
+    def reset(self, game):
+        pass
+
+    def next_direction(self, game):
+        options = safe_directions(game)
+        if not options:
+            return None
+        if game.food is None:
+            return options[0]
+        return min(options, key = lambda d: distance(game, neighbour(game, game.head, d), game.food))
+
+#Follows the shortest path to the food, found with a breadth first search around the snake's body.
+#The path is kept until the food moves or the next step on it becomes unsafe, and greedy steps are taken when there's no path.
+class BFSController():
+    def __init__(self, seed = None):
+        self.greedy = GreedyController()
+        self.path = deque()
+        self.target = None
+
+    def reset(self, game):
+        self.path.clear()
+        self.target = None
+
+    #Returns the directions leading from the head to the food, or an empty deque if the body blocks every path.
+    def search(self, game):
+        start = game.head
+        came_from = {start: None}
+        frontier = deque([start])
+        while frontier:
+            cell = frontier.popleft()
+            if cell == game.food:
+                path = deque()
+                while came_from[cell] is not None:
+                    cell, direction = came_from[cell]
+                    path.appendleft(direction)
+                return path
+            for direction in DIRECTIONS:
+                following = neighbour(game, cell, direction)
+                if following not in came_from and not game.occupied[following]:
+                    came_from[following] = (cell, direction)
+                    frontier.append(following)
+        return deque()
+
+    def next_direction(self, game):
+        if game.food is None:
+            return self.greedy.next_direction(game)
+        if self.target != game.food or not self.path or not is_safe(game, neighbour(game, game.head, self.path[0])):
+            self.target = game.food
+            self.path = self.search(game)
+        if self.path and self.path[0] != engine.OPPOSITE[game.direction]:
+            return self.path.popleft()
+        self.path.clear()
+        return self.greedy.next_direction(game)
+
+#Visits every cell of the board in a fixed cycle, which never dies once the snake is on the cycle.
+#The cycle needs an even number of rows or columns, on boards with neither it takes greedy steps instead.
+class HamiltonianController():
+    def __init__(self, seed = None):
+        self.greedy = GreedyController()
+
+    def reset(self, game):
+        pass
+
+    def next_direction(self, game):
+        if game.cols % 2 and game.rows % 2:
+            return self.greedy.next_direction(game)
+        direction = hamiltonian_cycle(game.cols, game.rows)[game.head]
+        if direction == engine.OPPOSITE[game.direction] or not is_safe(game, neighbour(game, game.head, direction)):
+            return self.greedy.next_direction(game)
+        return direction
+
+#Cycles built so far, keyed by board dimensions.
+cycles = {}
+
+#Returns the direction to the cell that follows the one at the given column and row on a cycle through the whole board,
+#worked out without building the cycle, so boards of millions of cells can be followed without a table the size of the
+#board.
+#The cycle zigzags along the rows over every column but the first, then returns up the first column. Boards with an odd
+#number of rows are zigzagged along their columns instead.
+def cycle_direction(cols, rows, col, row):
+    if rows % 2:
+        if cols % 2:
+            raise ValueError("A hamiltonian cycle needs an even number of rows or columns.")
+        d_row, d_col = cycle_direction(rows, cols, row, col)            #The cycle zigzags along the columns instead.
+        return d_col, d_row
+    if col == 0:
+        return engine.RIGHT if row == 0 else engine.UP
+    if row % 2 == 0:
+        return engine.DOWN if col == cols - 1 else engine.RIGHT
+    if col == 1:
+        return engine.LEFT if row == rows - 1 else engine.DOWN
+    return engine.LEFT
+
+#Returns a list holding the direction cycle_direction gives every cell, for controllers that look it up on every tick.
+def hamiltonian_cycle(cols, rows):
+    key = (cols, rows)
+    if key not in cycles:
+        cycles[key] = [cycle_direction(cols, rows, col, row) for row in range(rows) for col in range(cols)]
+    return cycles[key]
+
+#Returns the direction of a step between two neighbouring cells.
+def direction_to(game, a, b):
+    for direction in DIRECTIONS:
+        if neighbour(game, a, direction) == b:
+            return direction
+    return None
+
+#Drives the snake well enough to be left playing on its own, for demos, soak tests and the game's attract mode.
+#It takes the shortest path to the food that still lets the head reach the tail once the food is eaten, so it hardly
+#ever traps itself. When there's no such path it follows the hamiltonian cycle or its own tail.
+#Once the snake fills cycle_fraction of the board it stops going for the food and works its way onto the cycle: it
+#follows the cycle while that leaves it a way out and chases its tail otherwise, without leaving for the food, until its
+#whole body lies along the cycle. It then stays on the cycle, which is safe until the board is full and eats the food
+#within a lap of the board. If it goes a lap of the board without eating, its body is keeping it off the cycle, so it
+#goes for the food again until it has eaten, which changes its shape.
+#Searches are A* over cells, aware of time: a body cell can be entered on the step its part of the body leaves it, which
+#is worked out from entered, the tick the head last entered each cell, without scanning the body.
+#A path is kept and followed one cell per tick until the food moves, it's only searched again if a cell on it gets
+#taken, and then only the way back onto the rest of the path is searched. When no safe path is found, the search waits
+#a number of ticks that doubles with each failure before trying again, while the snake chases its tail.
+#Every search gives up after node_limit cells. The time spent choosing each direction is kept by timer, and counted as
+#dropped when over budget_ns.
+#If the snake still goes patience laps of the board without eating, the game is counted in stalls and the snake heads for
+#the food by the shortest path, safe or not, until it eats or dies, so no game is left going on forever.
+class Autopilot():
+    def __init__(self, seed = None, node_limit = 10000, budget_ns = 10**9 // 15, cycle_fraction = 0.5, patience = 2):
+        self.greedy = GreedyController()
+        self.node_limit = node_limit
+        self.cycle_fraction = cycle_fraction
+        self.patience = patience
+        self.timer = profiler.Profiler(("search",), budget_ns)
+        self.entered = None
+        self.clock = 0
+        self.nodes = 0              #Cells expanded while choosing the last direction, and since the autopilot was made.
+        self.total_nodes = 0
+        self.searches = 0
+        self.repairs = 0
+        self.stalls = 0             #Games in which the snake went patience laps of the board without eating.
+
+    def reset(self, game):
+        size = game.cols * game.rows
+        if self.entered is None or len(self.entered) != size:
+            self.entered = array("i", bytes(4 * size))
+        self.clock += game.length + 1               #Cells entered in the last game are too old to count as the body.
+        for i, cell in enumerate(game.body):
+            self.entered[cell] = self.clock - i
+        self.last_head = game.head
+        self.last_length = game.length
+        self.fed_at = self.clock    #When the snake last ate, or last had no food to go for.
+        self.stalled = False
+        self.has_cycle = game.cols % 2 == 0 or game.rows % 2 == 0
+        self.on_cycle = 1           #Parts of the body, from the head, lying in order along the hamiltonian cycle.
+        self.path = deque()         #Cells the head will go through, in order.
+        self.chasing = False        #True if the path leads to the tail instead of the food.
+        self.target = None
+        self.retry_at = 0
+        self.backoff = 1
+
+    def next_direction(self, game):
+        self.timer.start_frame()
+        self.nodes = 0
+        self.observe(game)
+        direction = self.choose(game)
+        self.total_nodes += self.nodes
+        self.timer.mark()
+        self.timer.end_frame()
+        return direction
+
+    #Catches up with the step the snake took since the last tick.
+    def observe(self, game):
+        head = game.head
+        if head == self.last_head:
+            return
+        self.clock += 1
+        self.entered[head] = self.clock
+        if self.has_cycle and head == self.cycle_cell(game, self.last_head):
+            self.on_cycle = min(self.on_cycle + 1, game.cols * game.rows)
+        else:
+            self.on_cycle = 1
+        self.last_head = head
+        if game.length != self.last_length or game.food is None:
+            self.last_length = game.length
+            self.fed_at = self.clock
+        if self.path and self.path[0] == head:
+            self.path.popleft()
+        else:
+            self.path.clear()
+
+    def cycle_cell(self, game, cell):
+        col, row = game.position(cell)
+        return neighbour(game, cell, cycle_direction(game.cols, game.rows, col, row))
+
+    def choose(self, game):
+        length = game.length
+        size = game.cols * game.rows
+        hungry = self.clock - self.fed_at
+        if hungry > self.patience * size:
+            return self.starve(game)
+        if self.has_cycle and length >= self.cycle_fraction * size and (hungry <= size or self.on_cycle >= length):
+            if self.on_cycle >= length or self.cycle_is_safe(game):
+                return self.follow_cycle(game)
+            direction = self.chase_tail(game)
+            if direction is not None:
+                return direction
+        if game.food != self.target:
+            self.target = game.food
+            self.path.clear()
+            self.retry_at = 0
+            self.backoff = 1
+        if self.chasing and game.food in self.path:
+            self.path.clear()                       #Eating on the way would hold the tail back a step.
+        if self.path and not is_safe(game, self.path[0]):
+            self.repair(game)
+        if game.food is not None and self.clock >= self.retry_at and (self.chasing or not self.path):
+            path = self.search(game, game.head, self.release(game), lambda cell, step: cell == game.food, game.food)
+            if path is not None and self.leaves_way_out(game, path):
+                self.path = deque(path)
+                self.chasing = False
+                self.backoff = 1
+            else:
+                self.retry_at = self.clock + self.backoff
+                self.backoff = min(self.backoff * 2, 64)
+        if self.path:
+            return direction_to(game, game.head, self.path[0])
+        if self.has_cycle and self.on_cycle >= length:
+            return self.follow_cycle(game)
+        if self.has_cycle and self.cycle_is_safe(game):
+            return self.follow_cycle(game)
+        direction = self.chase_tail(game)
+        if direction is not None:
+            return direction
+        return self.greedy.next_direction(game)
+
+    #Returns true if the head can still reach the tail after taking the cycle's next step.
+    def cycle_is_safe(self, game):
+        following = self.cycle_cell(game, game.head)
+        if following == game.body[1] or not is_safe(game, following):
+            return False
+        return self.leaves_way_out(game, [following], following == game.food)
+
+    def follow_cycle(self, game):
+        self.path.clear()
+        col, row = game.position(game.head)
+        return cycle_direction(game.cols, game.rows, col, row)
+
+    #Follows a path onto the body, reaching each of its cells after its part of the body left, which the head can then
+    #follow around forever. Returns the path's first direction, or None if there's no such path.
+    def chase_tail(self, game):
+        release = self.release(game)
+        path = self.search(game, game.head, release, self.reaches_body(release), game.body[-1], food = game.food)
+        if path is None:
+            return None
+        self.path = deque(path)
+        self.chasing = True
+        return direction_to(game, game.head, path[0])
+
+    #Heads for the food by the shortest path there is, or greedily if there's none, once the snake went too long without
+    #eating.
+    def starve(self, game):
+        if not self.stalled:
+            self.stalled = True
+            self.stalls += 1
+        self.path.clear()
+        if game.food is not None:
+            path = self.search(game, game.head, self.release(game), lambda cell, step: cell == game.food, game.food)
+            if path is not None:
+                return direction_to(game, game.head, path[0])
+        return self.greedy.next_direction(game)
+
+    #Searches for a way from the head back onto the rest of the path, after a cell on it was taken.
+    def repair(self, game):
+        self.repairs += 1
+        rest = {cell: i for i, cell in enumerate(self.path) if not game.occupied[cell]}
+        path = self.search(game, game.head, self.release(game), lambda cell, step: cell in rest, self.path[-1])
+        if path is not None:
+            path += list(self.path)[rest[path[-1]] + 1:]
+            if self.chasing or self.leaves_way_out(game, path):
+                self.path = deque(path)
+                return
+        self.path.clear()
+
+    #Returns a function giving the number of steps until a cell is free: 0 if it's free now, and more steps than the
+    #board has cells if it's taken by anything but this snake's body.
+    def release(self, game):
+        occupied, entered, clock, length = game.occupied, self.entered, self.clock, game.length
+        never = game.cols * game.rows
+
+        def release(cell):
+            if not occupied[cell]:
+                return 0
+            index = clock - entered[cell]
+            return length - index if 0 <= index < length else never
+        return release
+
+    #Returns a goal met by entering a cell of the body on the step its part of the body leaves it, after which the head
+    #can follow the body around forever.
+    def reaches_body(self, release):
+        return lambda cell, step: 0 < release(cell) <= step
+
+    #Returns true if, once the snake has followed the path, and eaten the food at its end if eats is true, its head can
+    #still reach its tail.
+    def leaves_way_out(self, game, path, eats = True):
+        now = self.release(game)
+        never = game.cols * game.rows
+        steps = len(path)
+        length = game.length + eats
+        along = {cell: steps - 1 - i for i, cell in enumerate(path)}
+
+        def release(cell):
+            if cell in along:
+                return length - along[cell]
+            left = now(cell)
+            if left == 0 or left == never:
+                return left
+            index = steps + game.length - left      #Its part of the body once the path is followed.
+            return length - index if index < length else 0
+
+        tail = game.body[length - 1 - steps] if steps < length else path[steps - length]
+        back = path[-2] if steps > 1 else game.head
+        food = None if eats else game.food
+        return self.search(game, path[-1], release, self.reaches_body(release), tail, back, food) is not None
+
+    #A* search from start to a cell meeting goal(cell, step), heading for target, which returns the path's cells after
+    #start or None. A cell can only be entered on or after the step release gives it, and the cell behind start is never
+    #entered first, since the snake can't turn back on itself.
+    #Eating the food on the way holds the tail back a step, so every step after it counts as one step earlier.
+    def search(self, game, start, release, goal, target, back = None, food = None):
+        self.searches += 1
+        cols, rows, size = game.cols, game.rows, game.cols * game.rows
+        target_row, target_col = divmod(target, cols)
+        if back is None and game.length > 1:
+            back = game.body[1]
+        came_from = {start: None}
+        steps = {start: 0}
+        late = {start: 0}                           #1 for cells reached after eating the food.
+        frontier = [(0, 0, start)]
+        expanded = 0
+        while frontier and expanded < self.node_limit:
+            f, h, cell = heapq.heappop(frontier)
+            g = steps[cell]
+            if f - h != g:
+                continue                            #A shorter way to the cell was found after this one was queued.
+            if cell != start and goal(cell, g - late[cell]):
+                path = []
+                while cell != start:
+                    path.append(cell)
+                    cell = came_from[cell]
+                path.reverse()
+                self.nodes += expanded
+                return path
+            expanded += 1
+            row, col = divmod(cell, cols)
+            following = (cell - 1 if col else cell + cols - 1, cell + 1 if col < cols - 1 else cell - cols + 1,
+                         cell - cols if row else cell + size - cols, cell + cols if row < rows - 1 else cell - size + cols)
+            step = g + 1
+            for next_cell in following:
+                delay = late[cell] or next_cell == food
+                if step >= steps.get(next_cell, size) or release(next_cell) > step - delay:
+                    continue
+                if cell == start and next_cell == back:
+                    continue
+                came_from[next_cell] = cell
+                steps[next_cell] = step
+                late[next_cell] = delay
+                next_row, next_col = divmod(next_cell, cols)
+                dx = abs(next_col - target_col)
+                dy = abs(next_row - target_row)
+                h = min(dx, cols - dx) + min(dy, rows - dy)
+                heapq.heappush(frontier, (step + h, h, next_cell))
+        self.nodes += expanded
+        return None
+
+    #Lines of text describing the time spent choosing each direction, in milliseconds, laid out like the profiler's.
+    def lines(self):
+        p50, p95, p99 = self.timer.summary()["search"]
+        ticks = max(self.timer.count, 1)
+        return [f" search {p50 / 1e6:6.2f} {p95 / 1e6:6.2f} {p99 / 1e6:6.2f}",
+                f"  nodes {self.total_nodes / ticks:6.0f}/tick, over {self.timer.dropped}, stalls {self.stalls}"]
+
+#Controllers by the name used to pick them from the command line.
+CONTROLLERS = dict(random = RandomController, greedy = GreedyController, bfs = BFSController,
+                   hamiltonian = HamiltonianController, autopilot = Autopilot)
@@ -0,0 +1,178 @@
+#Engine.py
+#Headless simulation of the snake game's rules.
+#Nothing in this module depends on pygame, so a game can be stepped without a display and as fast as the cpu allows.
+#The board is a grid of cols * rows cells, each cell is identified by a single int: row * cols + col.
+
+import random
+from array import array
+from collections import deque
+
+#Directions as (column, row) offsets.
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+#Outcomes of a single step.
+MOVED = 0
+ATE = 1
+DIED = 2
+WON = 3         #The snake ate the last food that fit on the board.
+
+#A position of a game, small enough to keep thousands of: the body is an array of 4 byte cells from head to tail, and
+#the board's occupancy, which an engine rebuilds from the body, isn't kept at all.
+class Snapshot():
+    def __init__(self, cols, rows, body, direction, food, ticks, over = False, won = False):
+        self.cols = cols
+        self.rows = rows
+        self.body = body
+        self.direction = direction
+        self.food = food
+        self.ticks = ticks
+        self.over = over
+        self.won = won
+
+#Holds the state of one game: the snake's body, its direction and the food, along with the seeded rng used to place food.
+#The body is a deque ordered from head to tail, the head is body[0]. Moving only pushes a new head and pops the tail,
+#so a step costs the same however long the snake is.
+#occupied has one byte per cell of the board, set while the snake is on that cell, so collision checks never scan the body.
+#free lists every cell the snake isn't on, in no particular order, and slot holds each cell's index in free (-1 if occupied).
+#A cell is taken out of free by swapping it with the last entry, so food can be placed uniformly in constant time
+#no matter how full the board is.
+class Engine():
+    def __init__(self, cols, rows, seed = None):
+        self.cols = cols
+        self.rows = rows
+        self.size = cols * rows
+        self.reset(5, seed)
+
+    #Starts a new game with a snake of the given length, heading right, with its head in the middle of the board.
+    #If spawn is false the board is left without food until spawn_food is called.
+    def reset(self, length, seed = None, spawn = True):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        col, row = self.cols // 2, self.rows // 2
+        self.place([self.cell(col - i, row) for i in range(length)], RIGHT, None)
+        if spawn:
+            self.spawn_food()
+
+    #Puts the snake on the given cells, ordered from head to tail, and the food on the given cell (or nowhere if None).
+    #Used to resume a game from a saved position, the occupancy and free cell indexes are rebuilt from the body.
+    def place(self, body, direction, food, ticks = 0):
+        self.direction = direction
+        self.ticks = ticks
+        self.over = False
+        self.won = False
+        self.food = food
+        self.vacated = None         #The cell the tail left on the last step, None if the snake grew or the step failed.
+        self.body = deque(body)
+        self.occupied = bytearray(self.size)
+        self.free = array("i", range(self.size))
+        self.slot = array("i", range(self.size))
+        for cell in self.body:
+            self.occupy(cell)
+
+    #Returns a snapshot of the game's position.
+    def snapshot(self):
+        return Snapshot(self.cols, self.rows, array("i", self.body), self.direction, self.food, self.ticks, self.over,
+                        self.won)
+
+    #Puts the game back in the position of a snapshot taken on a board of the same size.
+    #The rng isn't part of a snapshot, so food placed after restoring isn't the food the game placed after the snapshot.
+    def restore(self, snapshot):
+        if (snapshot.cols, snapshot.rows) != (self.cols, self.rows):
+            raise ValueError(f"A snapshot of a {snapshot.cols}x{snapshot.rows} board can't be restored on a "
+                             f"{self.cols}x{self.rows} board.")
+        self.place(snapshot.body, snapshot.direction, snapshot.food, snapshot.ticks)
+        self.over = snapshot.over
+        self.won = snapshot.won
+
+    #Returns the direction of a step from a cell to a neighbouring cell, which may be on the other side of an edge.
+    def direction_between(self, a, b):
+        a_col, a_row = self.position(a)
+        b_col, b_row = self.position(b)
+        return ((b_col - a_col + 1) % self.cols - 1, (b_row - a_row + 1) % self.rows - 1)
+
+    #Converts a column and row into a cell, wrapping around the edges of the board.
+    def cell(self, col, row):
+        return (row % self.rows) * self.cols + col % self.cols
+
+    #Converts a cell back into its column and row.
+    def position(self, cell):
+        row, col = divmod(cell, self.cols)
+        return col, row
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def length(self):
+        return len(self.body)
+
+    #Changes the snake's direction, the snake cannot turn back on itself as it would result in instant death.
+    def turn(self, direction):
+        if direction is not None and direction != OPPOSITE[self.direction]:
+            self.direction = direction
+
+    #The cell the head will move into on the next step, the head comes out of the other side of the board at the edges.
+    def next_cell(self):
+        col, row = self.position(self.head)
+        return self.cell(col + self.direction[0], row + self.direction[1])
+
+    #Marks a cell as taken by the snake and removes it from the free cells.
+    def occupy(self, cell):
+        index = self.slot[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[index] = last
+            self.slot[last] = index
+        self.slot[cell] = -1
+        self.occupied[cell] = 1
+
+    #Marks a cell as no longer taken by the snake and adds it back to the free cells.
+    def vacate(self, cell):
+        self.slot[cell] = len(self.free)
+        self.free.append(cell)
+        self.occupied[cell] = 0
+
+    #Places food on a random cell that isn't occupied by the snake.
+    #Returns None, and leaves the board without food, if the snake fills the whole board.
+    def spawn_food(self):
+        if not self.free:
+            self.food = None
+            return None
+        self.food = self.free[self.rng.randrange(len(self.free))]
+        return self.food
+
+    #Advances the game by one tick and returns MOVED, ATE, DIED or WON.
+    #The tail leaves its cell before the head arrives, so the head may follow right behind the tail.
+    def step(self, direction = None):
+        if self.over:
+            return WON if self.won else DIED
+        self.turn(direction)
+        head = self.next_cell()
+        ate = head == self.food
+        self.vacated = None
+        if not ate:
+            tail = self.body.pop()
+            self.vacate(tail)
+        if self.occupied[head]:
+            if not ate:
+                self.body.append(tail)
+                self.occupy(tail)
+            self.over = True
+            return DIED
+        if not ate:
+            self.vacated = tail
+        self.body.appendleft(head)
+        self.occupy(head)
+        self.ticks += 1
+        if ate:
+            if self.spawn_food() is None:
+                self.over = True
+                self.won = True
+                return WON
+            return ATE
+        return MOVED
@@ -19,4 +19,19 @@ def locate_res(relative_path):
 def verify_dir(path):
     pathlib.Path(path).mkdir(parents = True, exist_ok = True)
 
+#Returns the directory the given application should keep its saved data in, following each platform's conventions:
+#the local AppData folder on Windows, Application Support on macOS,
+#and $XDG_DATA_HOME (~/.local/share by default) everywhere else
+#The directory is not created
+def data_dir(app):
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME", "")
+        if not os.path.isabs(base):                 #Relative paths are invalid and must be ignored, as the spec says
+            base = os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, app)
+
 
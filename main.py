@@ -1,125 +1,143 @@
 #Snake Game by Jaffar Alzeidi.
 #This game was made with pygame.
 #The objective is to eat food and get as large as possible without colliding with the body of the snake.
-#Highscore saves to a local file.
-#The game's pause menu is made with tkinter.
+#Highscore and the history of every game are saved to a local database, see stats.py.
+#The game's pause menu is drawn over the game, inside the game window.
 #Last modified on 07/12/2021.
 
-import random
-import tkinter
+import time
+STARTED = time.perf_counter()       #When this module started loading, the game's startup times are measured from here.
+
 import functools
 import os
+import random
+from collections import deque
+import argparse
+import json
 
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 import pygame
 import pygame.freetype
 
 import file
+import engine
+import assets
+import replay
+import profiler
+import stats
+import camera
+import controllers
+IMPORTED = time.perf_counter()      #When every module the game needs was done loading.
 
 #Game window dimensions.
 WIDTH = 500
 HEIGHT = 400
-    
-pygame.init()                                                                    #Initialize the pygame module.
-JOKERMAN = pygame.freetype.Font(file.locate_res("res/fonts/JOKERMAN.ttf"), 17)   #Font used to display scores.
-EIGHT_BIT = pygame.freetype.Font(file.locate_res("res/fonts/8-BIT.ttf"), 17)     #Font used to display game over text.
+HEADER = 50                         #Height of the area above the playable area, where the scores are displayed.
+CELL = 10                           #Width and height of each cell of the playable area.
+COLS = WIDTH // CELL                #Default board size, which fills the playable area.
+ROWS = (HEIGHT - HEADER) // CELL
+MIN_BOARD = 10                      #Range of board widths and heights, boards bigger than the playable area scroll.
+MAX_BOARD = 2000
+
+FONT_SIZE = 17              #Size of the JOKERMAN font used to display scores, and the EIGHT_BIT font used for game over text.
+TICK_RATE = 15              #Default number of times the game is stepped per second.
+FPS = 60                    #Default cap on the number of frames drawn per second, 0 for no cap.
+MAX_CATCH_UP = 5            #Most ticks run in a single frame when the game falls behind.
+ATTRACT_DELAY = 2           #Seconds the game over screen stays up before the autopilot plays again.
+MENU_FONT_SIZE = 14
+OVERLAY_FONT_SIZE = 10
+OVERLAY_RECT = pygame.Rect(5, HEADER + 5, 240, 124)    #Area covered by the profiler's overlay when it's shown.
+#Fonts the first frame doesn't use. They're loaded once it's on screen, so neither the window nor the game loop waits on them.
+LATE_FONTS = ((assets.EIGHT_BIT, FONT_SIZE), (assets.EIGHT_BIT, OVERLAY_FONT_SIZE), (assets.JOKERMAN, MENU_FONT_SIZE),
+              (assets.JOKERMAN, MENU_FONT_SIZE - 3))
 
 CYAN = (0, 255, 255)
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 
-#Spawns at a random location within the screen, the snake grows when collided with this game object.
-class Food(pygame.sprite.Sprite):
-    def __init__(self):
-        super().__init__()
-        left = random.randint(0, WIDTH/10 - 1) * 10
-        top = random.randint(5, HEIGHT/10 - 1) * 10 
-        self.surface = pygame.image.load(file.locate_res("res/images/Apple.jpg"))
-        self.rect = self.surface.get_rect(topleft = (left, top))
-
-#Represents each part of the snake.
-class BodyPart(pygame.sprite.Sprite):
-    def __init__(self, color, left, top):
-        super().__init__()
-        self.surface = pygame.Surface((10, 10))
-        self.rect = self.surface.get_rect(topleft = (left, top))
-        self.surface.fill(color)
+PLAY_AREA = pygame.Rect(0, HEADER, WIDTH, HEIGHT - HEADER)
+
+#Returns the part of a cell's rect covered by something that has moved the given fraction of the way into it.
+def entering_rect(rect, direction, fraction):
+    size = round(CELL * fraction)
+    if direction == engine.RIGHT:
+        return pygame.Rect(rect.left, rect.top, size, CELL)
+    if direction == engine.LEFT:
+        return pygame.Rect(rect.right - size, rect.top, size, CELL)
+    if direction == engine.DOWN:
+        return pygame.Rect(rect.left, rect.top, CELL, size)
+    return pygame.Rect(rect.left, rect.bottom - size, CELL, size)
+
+#The food is drawn as an apple on whichever cell the engine placed it.
+class Food():
+    def __init__(self, camera):
+        self.camera = camera
+        self.surface = assets.shared.image(assets.APPLE)
+
+    def render(self, window, engine):
+        if engine.food is not None:
+            window.blit(self.surface, self.camera.rect(engine.food))
 
 #Controls where the snake will go.
-class Head(BodyPart):
-    def __init__(self, color, left, top):
-        super().__init__(color, left, top)
-        self.x_speed = self.rect.width
-        self.y_speed = 0
-
-    #Changes the direction of the head based on key press.
-    #Head cannot go in the opposite of its current direction, as it would result in instant death.
-    def change_direction(self, pressed_keys):
-        if pressed_keys[pygame.K_UP] or pressed_keys[pygame.K_w]:
-            if self.y_speed == 0:
-                self.x_speed = 0
-                self.y_speed = -self.rect.height
-        elif pressed_keys[pygame.K_DOWN] or pressed_keys[pygame.K_s]:
-            if self.y_speed == 0:
-                self.x_speed = 0
-                self.y_speed = self.rect.height
-        elif pressed_keys[pygame.K_LEFT] or pressed_keys[pygame.K_a]:
-            if self.x_speed == 0:
-                self.x_speed = -self.rect.width
-                self.y_speed = 0
-        elif pressed_keys[pygame.K_RIGHT] or pressed_keys[pygame.K_d]:
-            if self.x_speed == 0:
-                self.x_speed = self.rect.width
-                self.y_speed = 0
-
-    #Moves the head's location based on the current direction.
-    #Checks if the head has moved beyond the playable area, in which case it comes out of the other side of the playable area.
-    def move(self):
-        self.rect.move_ip(self.x_speed, self.y_speed)
-        if self.rect.left < 0:
-            self.rect.left = WIDTH - self.rect.width
-        elif self.rect.left + self.rect.width > WIDTH:
-            self.rect.left = 0
-        elif self.rect.top < 50:
-            self.rect.top = HEIGHT - self.rect.height
-        elif self.rect.top + self.rect.height > HEIGHT:
-            self.rect.top = 50
-
-    #Draws a set of eyes on the head, the location of the eyes is dependent on the speed of the head.
-    def draw_eyes(self, color):
-        if self.x_speed < 0:
-            pygame.draw.circle(self.surface, color, (2,2), 1)
-            pygame.draw.circle(self.surface, color, (2,8), 1)
-        elif self.x_speed > 0:
-            pygame.draw.circle(self.surface, color, (8,2), 1)
-            pygame.draw.circle(self.surface, color, (8,8), 1)
-        elif self.y_speed < 0:
-            pygame.draw.circle(self.surface, color, (2,2), 1)
-            pygame.draw.circle(self.surface, color, (8,2), 1)
+#Key presses are queued as they arrive and used one per tick, so quick turns made within a single tick aren't lost.
+class Head():
+    KEYS = {pygame.K_UP: engine.UP, pygame.K_w: engine.UP, pygame.K_DOWN: engine.DOWN, pygame.K_s: engine.DOWN,
+            pygame.K_LEFT: engine.LEFT, pygame.K_a: engine.LEFT, pygame.K_RIGHT: engine.RIGHT, pygame.K_d: engine.RIGHT}
+    QUEUE_SIZE = 3
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queue = deque()
+        self.pilot = None           #The autopilot steering the snake instead of the keys, if it's on.
+
+    #Queues the direction of a pressed key.
+    #A turn that wouldn't change the direction the snake will be heading in by then, including turning back on itself,
+    #is dropped, and so is any turn once the queue is full or while the autopilot is steering.
+    def key_down(self, key):
+        direction = Head.KEYS.get(key)
+        if direction is None or self.pilot is not None or len(self.queue) >= Head.QUEUE_SIZE:
+            return
+        heading = self.queue[-1] if self.queue else self.engine.direction
+        if direction != heading and direction != engine.OPPOSITE[heading]:
+            self.queue.append(direction)
+
+    #Changes the direction of the head to the next queued key press, or to the autopilot's choice, called once per tick.
+    def change_direction(self):
+        if self.pilot is not None:
+            self.engine.turn(self.pilot.next_direction(self.engine))
+        elif self.queue:
+            self.engine.turn(self.queue.popleft())
+
+    #Draws a set of eyes on the head, the location of the eyes is dependent on the direction of the head.
+    def draw_eyes(self, window, rect, color):
+        direction = self.engine.direction
+        if direction == engine.LEFT:
+            eyes = (2,2), (2,8)
+        elif direction == engine.RIGHT:
+            eyes = (8,2), (8,8)
+        elif direction == engine.UP:
+            eyes = (2,2), (8,2)
         else:
-            pygame.draw.circle(self.surface, color, (2,8), 1)
-            pygame.draw.circle(self.surface, color, (8,8), 1)
+            eyes = (2,8), (8,8)
+        for x, y in eyes:
+            pygame.draw.circle(window, color, (rect.left + x, rect.top + y), 1)
 
-#Holds all the snake's body parts including the head.
+#Draws the snake held by the engine, where the camera shows it.
 #The color variable holds the snake's primary color.
 #The secondary_color variable holds the snake's eye color.
 class Snake():
-    def __init__(self, color, secondary_color):
+    def __init__(self, engine, camera, color, secondary_color):
+        self.engine = engine
+        self.camera = camera
+        self.head = Head(engine)
         self.color = color
         self.secondary_color = secondary_color
-        self.eat_sound = Sound(file.locate_res("res/sounds/bite.WAV"))
-        self.death_sound = Sound(file.locate_res("res/sounds/youlose.WAV"))
-
-    #Creates the head and the snake's body parts. This method is called when the game starts, and every time the player
-    #chooses to play again.
-    def construct(self, length):
-        self.head = Head(self.color, WIDTH/2, HEIGHT/2)
-        self.parts = []
-        self.parts.append(self.head)
-        for i in range(1, length):
-            left = self.parts[i-1].rect.left - self.parts[i-1].rect.width
-            top = self.parts[i-1].rect.top
-            part = BodyPart(self.color, left, top)
-            self.parts.append(part)
+        self.eat_sound = Sound(assets.shared.sound(assets.BITE))
+        self.death_sound = Sound(assets.shared.sound(assets.YOU_LOSE))
+
+    @property
+    def length(self):
+        return self.engine.length
 
     #Changes the snake's primary color.
     def change_color(self, hex_color):
@@ -128,58 +146,79 @@ class Snake():
     #Changes the snake's secondary color.
     def change_sec_color(self, hex_color):
         self.secondary_color = Color.to_rgb(hex_color)
-    
-    def render(self):
-        for part in self.parts:
-            part.surface.fill(self.color)           #Erases previously drawn eyes.
-        self.head.draw_eyes(self.secondary_color)
-
-    #The snake is moved by moving each part to the location of the part before it in the list of parts (except the head)
-    def slither(self):
-        last_index = len(self.parts) - 1
-        for i in range(last_index, 0, -1):
-            self.parts[i].rect.left = self.parts[i-1].rect.left
-            self.parts[i].rect.top = self.parts[i-1].rect.top
-        self.head.move()
-    
-    #Adds a new BodyPart to the snake, placing it at the snake's head's location, the snake's head is then moved.
-    #NOTE: if grow is called, slither shouldn't be called during the same frame because grow places the newly created part.
-    #in the head's location, the the head is moved, thus creating the slither effect in a more efficient way.
-    def grow(self):
-        part = BodyPart(self.color, self.head.rect.left, self.head.rect.top)
-        self.parts.insert(1, part)
-        self.head.move()
-        return part
-
-    #Checks if the snake's head collided with food
-    def head_collided_food(self, food_list):
-        if pygame.sprite.spritecollide(self.head, food_list, True):
-            return True
-        return False
-
-    #Checks if any part of the snake has collided with food. 
-    #Called to make sure that newly spawned food does not spawn on top of the snake.
-    def collided_food(self, food):
-        for part in self.parts:
-            if pygame.sprite.collide_rect(part, food):
-                return True
-        return False
 
-    #Check if the snake's head collided its body.
-    def collided_body(self):
-        for i in range(1, len(self.parts)):
-            if pygame.sprite.collide_rect(self.head, self.parts[i]):
-                return True
-        return False
-
-#Extends the sound functionality to only play if sound_on is true.
-class Sound(pygame.mixer.Sound):
-    def __init__(self, src):
-        super().__init__(src)
+    #Fills the parts of the snake inside the camera's view, then draws the eyes on top of the head.
+    #The parts are found from the occupied cells of the view rather than the body, so drawing a snake of any length costs
+    #the same, and neighbouring parts in a row are filled at once.
+    #Rects are clipped to the view before they're filled, since fill moves a rect hanging off the window's left or top
+    #edge onto the window instead of cutting it.
+    #alpha is the fraction of the time until the next tick that has passed since the last tick. Below 1 the snake is
+    #drawn part of the way between where it was before the last tick and where it is now, see render_motion.
+    def render(self, window, alpha = 1.0):
+        moving = alpha < 1
+        for rect in self.camera.runs(self.engine.occupied, self.engine.head if moving else None):
+            window.fill(self.color, rect)
+        if moving:
+            self.render_motion(window, alpha)
+        else:
+            self.head.draw_eyes(window, self.camera.rect(self.engine.head), self.secondary_color)
+
+    #Draws a single part of the snake and returns the rect it covers, the head also gets its eyes unless eyes is false.
+    def render_part(self, window, cell, eyes = True):
+        rect = self.camera.rect(cell)
+        window.fill(self.color, rect.clip(self.camera.view))
+        if eyes and cell == self.engine.head:
+            self.head.draw_eyes(window, rect, self.secondary_color)
+        return rect
+
+    #Cells that are only partly covered between ticks: the head's cell, the cell behind it and the cell the tail left.
+    def moving_cells(self):
+        cells = [self.engine.head]
+        if self.engine.length > 1:
+            cells.append(self.engine.body[1])
+        if self.engine.vacated is not None:
+            cells.append(self.engine.vacated)
+        return cells
+
+    #Draws the head alpha of the way into its cell and the tail alpha of the way out of the cell it left.
+    #The eyes are drawn on a cell sized head sliding between the two cells, and are hidden while it wraps around an edge.
+    def render_motion(self, window, alpha):
+        direction = self.engine.direction
+        head_rect = self.camera.rect(self.engine.head)
+        window.fill(self.color, entering_rect(head_rect, direction, alpha).clip(self.camera.view))
+        vacated = self.engine.vacated
+        if vacated is not None:
+            leaving = self.engine.direction_between(vacated, self.engine.body[-1])
+            tail_rect = entering_rect(self.camera.rect(vacated), engine.OPPOSITE[leaving], 1 - alpha)
+            window.fill(self.color, tail_rect.clip(self.camera.view))
+        shift = round(CELL * (1 - alpha))
+        self.head.draw_eyes(window, head_rect.move(-direction[0] * shift, -direction[1] * shift), self.secondary_color)
+
+#Wraps a cached sound so that it only plays if sound_on is true.
+#The sound is None when there's no audio device, and never plays.
+class Sound():
+    def __init__(self, sound):
+        self.sound = sound
 
     def play(self, sound):
-        if sound:
-            super().play()
+        if sound and self.sound is not None:
+            self.sound.play()
+
+#A line of text that is only rendered again when its contents change.
+class Text():
+    def __init__(self, font_path, color):
+        self.font_path = font_path
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    #Renders the text if it differs from the last rendered text, returns true if it did.
+    def update(self, text):
+        if text == self.text:
+            return False
+        self.text = text
+        self.surface, _ = assets.shared.font(self.font_path, FONT_SIZE).render(text, self.color)
+        return True
 
 #Helper class which contains a method to convert from hex to rgb color format.
 class Color():
@@ -192,7 +231,7 @@ class Color():
 class Button(pygame.sprite.Sprite):
     def __init__(self, img, left, top, on_click):
         super().__init__()
-        self.surface = pygame.image.load(img).convert()
+        self.surface = assets.shared.image(img)
         self.rect = self.surface.get_rect(topleft = (left, top))
         self.on_click = on_click
 
@@ -202,59 +241,34 @@ class Button(pygame.sprite.Sprite):
             if self.rect.top <= mouse_y <= self.rect.top + self.rect.height:
                 self.on_click()
 
-#Menu used to pause game and manipulate game settings
+#Menu used to pause game and manipulate game settings.
+#The menu is drawn over the game inside the game window, so the window keeps handling its events while it's open.
+#Nothing is drawn while the menu is open unless changed is true, which is set whenever a setting changes.
 class SettingsMenu():
+    BG = (135, 206, 235)                        #Background color of the menu.
+    RED = (255, 0, 0)
+    RECT = pygame.Rect(0, 0, 250, 230)
+    COLORS = dict(black = "#000000", orange = "#FFA500", red = "#FF0000", cyan = "#00FFFF",
+                  pink = "#FFC0CB", white = "#FFFFFF", blue = "#0000FF", neongreen = "#39FF14",
+                  purple = "#800080", peach = "#FFE5B4")
+
     def __init__(self, game):
-        self.bg = "#87CEEB"                             #Background color of the window.
-        self.root = tkinter.Tk()
-        self.root.title(string = "Settings")
-        self.root.minsize(width = 220, height = 210)
-        self.root.configure(bg = self.bg)
-        self.root.resizable(False, False)
-        icon = tkinter.PhotoImage(file = file.locate_res("res/images/MenuIcon.png"))
-        self.root.iconphoto(False, icon)
-        self.frame = tkinter.Frame(master = self.root, bg = self.bg)
-        self.frame.pack()
         self.game = game
-        self.sound = tkinter.BooleanVar()               #Keeps track of the sound checkbutton's status.
-        self.confirmation = False                       #True when the conf_window is on screen, false otherwise.
-        self.add_widgets()
-        self.center(self.root)
-        self.check_quit()
-        self.root.mainloop()
-
-    #Periodically check for the pygame quit event, in which case the program is exited.
-    #Without this check, the program will not respond to the quit event on the pygame window.
-    def check_quit(self):
-        if pygame.event.get(eventtype = pygame.QUIT):
-            self.game.running = False
-            self.root.destroy()
-        self.root.after(250, self.check_quit)
-
-    #Centers a window mid-screen.
-    def center(self, window):
-        window.update_idletasks()                               #called to update the dimensions of the window
-        window_width = window.winfo_width()
-        window_height = window.winfo_height()
-        screen_width = window.winfo_screenwidth()
-        screen_height = window.winfo_screenheight()
-        window_x = int(screen_width/2 - window_width/2)
-        window_y = int(screen_height/3 - window_height/3)
-        window.geometry(f"+{window_x}+{window_y}")
-
-    #Called when the sound checkbutton is clicked
+        self.rect = SettingsMenu.RECT.copy()
+        self.rect.center = PLAY_AREA.center
+        self.confirmation = False                   #True while the reset highscore confirmation is on screen.
+        self.changed = True
+        self.targets = []                           #Clickable areas of the menu and their callbacks, set when drawn.
+
+    #Called when the sound checkbox is clicked.
     def on_toggle(self):
-        if self.sound.get():
-            self.game.sound = True
-        else:
-            self.game.sound = False
+        self.game.sound = not self.game.sound
+        self.changed = True
 
-    #Checkbutton to enable/disable sound effects in the game.
-    def add_sound_widget(self):
-        self.sound.set(self.game.sound)       
-        sound_checkbtn = tkinter.Checkbutton(master = self.frame, text = "Sound Effects",
-                                             variable = self.sound, command = self.on_toggle, bg = self.bg)
-        sound_checkbtn.pack(pady = 7)
+    #Called when a color button is clicked.
+    def on_color(self, on_click, hex_color):
+        on_click(hex_color)
+        self.changed = True
 
     #Callback for the reset button.
     def on_reset(self):
@@ -262,217 +276,569 @@ class SettingsMenu():
         self.game.update_highscore()
         self.exit_conf_window()
 
-    #Exits the reset highscore confirmation window.
+    #Exits the reset highscore confirmation.
     def exit_conf_window(self):
         self.confirmation = False
-        self.conf_window.destroy()
+        self.changed = True
 
-    #Window used to confirm the resetting of the highscore.
-    #If confirmation is true, then there is already a confirmation window on the screen, therefore there is no need to display
-    #another one.
+    #Asks to confirm the resetting of the highscore.
     def confirm_window(self):
-        if self.confirmation:
-            return
-        self.conf_window = tkinter.Toplevel(self.root)
-        icon = tkinter.PhotoImage(file = file.locate_res("res/images/Warning.png"))
-        self.conf_window.iconphoto(False, icon)
-        self.conf_window.title(string = "Confirm")
-        self.conf_window.configure(bg = self.bg)
-        self.conf_window.resizable(False, False)
-        self.conf_window.focus_set()
-        self.conf_window.protocol("WM_DELETE_WINDOW", self.exit_conf_window)
-        label = tkinter.Label(master = self.conf_window, text = "Do you wish to reset the current highscore?",
-                              fg = "red", bg = self.bg)
-        label.pack()
-        btn_frame = tkinter.Frame(master = self.conf_window, bg = self.bg)
-        btn_frame.pack()
-        yes_btn = tkinter.Button(master = btn_frame, text = "Yes", fg = "black", command = self.on_reset)
-        no_btn = tkinter.Button(master = btn_frame, text = "No", fg = "black", command = self.exit_conf_window)
-        yes_btn.pack(side = tkinter.LEFT, padx = 5, pady = 1)
-        no_btn.pack(side = tkinter.LEFT, padx = 5, pady = 1)
-        self.center(self.conf_window)
         self.confirmation = True
-
-    #Adds all widgets to the window.
-    def add_widgets(self):
-        paused_lbl = tkinter.Label(master = self.frame, text = "Paused", fg = "red", bg = self.bg, font = "Times 18")
-        paused_lbl.pack()
-        self.add_sound_widget()
-        colors = dict(black = "#000000", orange = "#FFA500", red = "#FF0000", cyan = "#00FFFF",
-                      pink = "#FFC0CB", white = "#FFFFFF", blue = "#0000FF", neongreen = "#39FF14",
-                      purple = "#800080", peach = "#FFE5B4")     
-        self.color_buttons("Color: ", colors, self.game.snake.change_color)                         #Primary colors
-        self.color_buttons("Secondary Color: ", colors, self.game.snake.change_sec_color)           #Secondary colors
-        reset_btn = tkinter.Button(master = self.frame, text = "Reset Highscore",
-                                   fg = "black", bd = 3, command = self.confirm_window)
-        reset_btn.pack(pady = 7)
+        self.changed = True
+
+    #Handles a click or key press made while the menu is open.
+    #While the confirmation is on screen, only its buttons respond to clicks.
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            if self.confirmation:
+                self.exit_conf_window()
+            else:
+                self.game.resume()
+        elif event.type == pygame.MOUSEBUTTONUP:
+            for rect, on_click in self.targets:
+                if rect.collidepoint(event.pos):
+                    on_click()
+                    return
+
+    #Draws text centered on the given x coordinate and returns the rect it covers.
+    def label(self, window, text, center_x, top, color = BLACK, size = MENU_FONT_SIZE):
+        font = assets.shared.font(assets.JOKERMAN, size)
+        rect = font.get_rect(text)
+        rect.midtop = (center_x, top)
+        font.render_to(window, rect, text, color)
+        return rect
+
+    #Draws a button with a label and makes it clickable.
+    def button(self, window, text, center_x, top, on_click):
+        rect = self.label(window, text, center_x, top + 4).inflate(16, 8)
+        pygame.draw.rect(window, WHITE, rect)
+        pygame.draw.rect(window, BLACK, rect, 2)
+        self.label(window, text, center_x, top + 4)
+        self.targets.append((rect, on_click))
+        return rect
 
     #Displays color buttons with a description of what the buttons are used for.
     #Used for changing the primary and secondary colors of the snake.
-    def color_buttons(self, desc, colors, on_click):
-        colors_lbl = tkinter.Label(master = self.frame, text = desc, bg = self.bg)
-        colors_lbl.pack()
-        colors_frm = tkinter.Frame(master = self.frame)
-        colors_frm.pack()
-        for key, value in colors.items():
-            color_btn = tkinter.Button(master = colors_frm, width = 1, height = 1, 
-                                       bg = value, bd = 3, command = functools.partial(on_click, value))
-            color_btn.pack(side = tkinter.LEFT)
+    def color_buttons(self, window, desc, top, selected, on_click):
+        self.label(window, desc, self.rect.centerx, top)
+        left = self.rect.centerx - len(SettingsMenu.COLORS) * 22 // 2
+        for i, value in enumerate(SettingsMenu.COLORS.values()):
+            rect = pygame.Rect(left + i * 22 + 2, top + 22, 18, 18)
+            window.fill(Color.to_rgb(value), rect)
+            pygame.draw.rect(window, WHITE if Color.to_rgb(value) == selected else BLACK, rect, 2)
+            self.targets.append((rect, functools.partial(self.on_color, on_click, value)))
+
+    #Draws the menu, or the confirmation in its place while it's on screen.
+    def draw(self, window):
+        self.targets = []
+        window.fill(SettingsMenu.BG, self.rect)
+        pygame.draw.rect(window, BLACK, self.rect, 2)
+        x, top = self.rect.centerx, self.rect.top
+        if self.confirmation:
+            self.label(window, "Do you wish to reset", x, top + 70, SettingsMenu.RED)
+            self.label(window, "the current highscore?", x, top + 92, SettingsMenu.RED)
+            self.button(window, "Yes", x - 35, top + 125, self.on_reset)
+            self.button(window, "No", x + 35, top + 125, self.exit_conf_window)
+        else:
+            self.label(window, "Paused", x, top + 8, SettingsMenu.RED, FONT_SIZE)
+            box = pygame.Rect(0, 0, 12, 12)
+            text = self.label(window, "Sound Effects", x + 10, top + 36)
+            box.midright = (text.left - 6, text.centery)
+            pygame.draw.rect(window, BLACK, box, 1)
+            if self.game.sound:
+                window.fill(BLACK, box.inflate(-6, -6))
+            self.targets.append((box.union(text), self.on_toggle))
+            self.color_buttons(window, "Color:", top + 60, self.game.snake.color, self.game.snake.change_color)
+            self.color_buttons(window, "Secondary Color:", top + 106, self.game.snake.secondary_color,
+                               self.game.snake.change_sec_color)
+            self.button(window, "Reset Highscore", x - 50, top + 158, self.confirm_window)
+            self.button(window, "Resume", x + 70, top + 158, self.game.resume)
+            self.label(window, "ESC also resumes", x, top + 200, BLACK, MENU_FONT_SIZE - 3)
+        self.changed = False
 
 class Game():
     ADDFOOD = pygame.USEREVENT + 1  #Custom Event used to spawn food a short while after the game starts.
-    SAVE_LOCATION = os.path.join(os.path.expanduser("~"), "AppData/Local/Snakery")
-    def __init__(self):
-        icon = pygame.image.load(file.locate_res("res/images/Snake.ico"))
+    SAVE_LOCATION = file.data_dir("Snakery")
+    #tick_rate is the number of times the game is stepped per second, and fps caps how often it's drawn (0 for no cap).
+    #With vsync, frames are drawn in step with the display's refresh rate instead.
+    #The board is cols by rows cells, the window stays the same size and scrolls over boards that don't fit in it.
+    #Stats are saved in save_location, or in SAVE_LOCATION if it's None.
+    def __init__(self, tick_rate = TICK_RATE, fps = FPS, vsync = False, cols = COLS, rows = ROWS, save_location = None):
+        self.startup = dict(imports = IMPORTED - STARTED)  #Seconds from STARTED to each step of starting the game.
+        self.quit_after_first_frame = False                #If true, the game closes as soon as its first frame is drawn.
+        self.first_frame_loads = None                      #Resources read from disk by the time the first frame was done.
+        pygame.display.init()                              #Only the subsystems the game uses are started.
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            pass                                            #No audio device, the game is played without sound effects.
+        icon = assets.shared.image(assets.SNAKE_ICON, convert = False)
         pygame.display.set_icon(icon)
         pygame.display.set_caption("Snakery")
-        self.window = pygame.display.set_mode((WIDTH, HEIGHT))
-        self.snake = Snake(CYAN, BLACK)
+        if vsync:
+            self.window = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync = 1)
+        else:
+            self.window = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.mark_startup("display")
+        self.tick_rate = tick_rate
+        self.fps = 0 if vsync else fps
+        self.interpolate = True             #If true, frames between ticks draw the snake part of the way to its next cell.
+        assets.shared.preload(fonts = ((assets.JOKERMAN, FONT_SIZE),))    #The rest of the fonts wait for LATE_FONTS.
+        self.engine = engine.Engine(cols, rows)
+        self.camera = camera.Camera(cols, rows, CELL, PLAY_AREA)
+        self.snake = Snake(self.engine, self.camera, CYAN, BLACK)
+        self.food = Food(self.camera)
         self.clock = pygame.time.Clock()
         self.running = True
         self.sound = True
-        self.settings_btn = Button(file.locate_res("res/images/SettingsIcon.PNG"), WIDTH - 50, 8, self.pause)
-        self.highscore = self.read_highscore()
+        self.settings_btn = Button(assets.SETTINGS_ICON, WIDTH - 50, 8, self.pause)
+        self.stats = stats.Stats(Game.SAVE_LOCATION if save_location is None else save_location)
+        self.highscore = 0                  #Raised to the saved best length once the stats writer has read it.
+        self.read_best = False              #True once the saved best length has been read, or reset before it was.
+        self.score_text = Text(assets.JOKERMAN, CYAN)
+        self.highscore_text = Text(assets.JOKERMAN, CYAN)
+        self.full_redraw = False            #If true every frame redraws the whole window, otherwise only what changed.
+        self.dirty_cells = set()            #Cells changed by the engine since the last frame.
+        self.drawn_food = None              #Cell the food was on when it was last drawn.
+        self.drawn_scores = []              #Rects covered by the score texts when they were last drawn.
+        self.redraw = True                  #True when the next frame must redraw the whole window.
+        self.record_dir = None              #If set, every game is recorded to a replay file in this directory.
+        self.recorder = None
+        self.profiler = None                #Set by enable_profiler, the game loop isn't timed otherwise.
+        self.overlay = False                #True while the profiler's timings are drawn on screen, toggled with F3.
+        self.overlay_lines = []
+        self.overlay_time = 0
+        self.autopilot = None               #Made the first time the autopilot is turned on, with F2 or --autopilot.
+        self.broadcaster = None             #If set, every change to the game is streamed to viewers, see broadcast.py.
+        self.motion_cells = []              #Cells partly covered by the snake on the last frame drawn between ticks.
+        self.menu = None                    #The settings menu while the game is paused.
+        self.alpha = 1.0                    #How far between ticks the last frame was drawn.
+        self.started = 0                    #When the current game started.
+        self.paused_at = 0                  #When the settings menu was last opened.
+        self.paused_time = 0                #Seconds the current game has spent paused.
+        self.mark_startup("game")
+
+    #Records how long the game took to get to the given step of starting up.
+    def mark_startup(self, step):
+        self.startup[step] = time.perf_counter() - STARTED
+
+    #Called once the first frame is on screen, loads what the first frame didn't need.
+    def first_frame(self):
+        self.mark_startup("first_frame")
+        assets.shared.preload(fonts = LATE_FONTS)
+        self.mark_startup("late_fonts")
+        self.first_frame_loads = assets.shared.load_count()
+        if self.quit_after_first_frame:
+            self.running = False
+
+    #Startup times in milliseconds, one line per step.
+    def startup_report(self):
+        return "\n".join(f"{step:>12}: {seconds * 1000:7.1f} ms" for step, seconds in self.startup.items())
+
+    #Starts timing each phase of the game loop.
+    #A frame's budget is the time between two frames at the frame rate cap, or between two ticks if frames aren't capped.
+    def enable_profiler(self):
+        budget = 10**9 // (self.fps or self.tick_rate)
+        self.profiler = profiler.Profiler(("events", "step", "render", "wait"), budget, wait = "wait")
+        assets.shared.font(assets.EIGHT_BIT, OVERLAY_FONT_SIZE)
+
+    #Hands the snake over to the autopilot, or back to the keys if the autopilot is driving.
+    #The autopilot's search times are counted as dropped when they take longer than a tick.
+    def toggle_autopilot(self):
+        head = self.snake.head
+        if head.pilot is not None:
+            head.pilot = None
+            head.queue.clear()
+            return
+        if self.autopilot is None:
+            self.autopilot = controllers.Autopilot(budget_ns = 10**9 // self.tick_rate)
+        head.pilot = self.autopilot
+        head.pilot.reset(self.engine)
+        head.queue.clear()
 
-    #Pauses the game and displays the settings menu.
-    #MOUSEBUTTONUP events are cleared after resuming to avoid the spawning of multiple settings menus.
+    #Pauses the game and displays the settings menu, clicking the settings button again resumes the game.
     def pause(self):
-        SettingsMenu(self)
-        pygame.event.clear(eventtype = pygame.MOUSEBUTTONUP)
-    
-    #Reads the highscore from a local file.
-    #If the file doesn't exist, it is created
-    #If the file is empty or the data in the file is not convertable to int (not a number) then 0 is returned.
-    def read_highscore(self):
-        file.verify_dir(Game.SAVE_LOCATION)
-        with open(os.path.join(Game.SAVE_LOCATION, "highscore.txt"), "a+") as reader:
-            reader.seek(0)
-            data = reader.readline()
-            try:
-                return int(data)
-            except ValueError:
-                return 0
+        if self.menu is not None:
+            self.resume()
+        else:
+            self.menu = SettingsMenu(self)
+            self.paused_at = time.perf_counter()
+
+    #Closes the settings menu and carries on with the game.
+    def resume(self):
+        self.menu = None
+        self.redraw = True
+        self.last_frame_time = time.perf_counter()         #The time spent in the menu isn't played.
+        self.paused_time += self.last_frame_time - self.paused_at
     
-    #Overwrites the old highscore with the current highscore.
-    def write_highscore(self):
-        file.verify_dir(Game.SAVE_LOCATION)
-        with open(os.path.join(Game.SAVE_LOCATION, "highscore.txt"), "w") as writer:
-            writer.write(str(self.highscore))
-
-    #Deletes the saved highscore.
+    #Deletes the saved highscore, the history of past games is kept.
     def reset_highscore(self):
-        file.verify_dir(Game.SAVE_LOCATION)
-        with open(os.path.join(Game.SAVE_LOCATION, "highscore.txt"), "w"):
-            pass
+        self.stats.reset_best()
         self.highscore = 0
+        self.read_best = True
+
+    #Saves the game that just ended to the stats, which also saves the highscore if it was beaten.
+    #The stats are written by a background thread, so this never waits on the disk.
+    #Games that ended before their first tick aren't saved.
+    def record_game(self, outcome):
+        if self.engine.ticks == 0:
+            return
+        seconds = time.perf_counter() - self.started - self.paused_time
+        if self.menu is not None:
+            seconds -= time.perf_counter() - self.paused_at
+        self.stats.add_game(stats.GameRecord(self.snake.length, self.engine.ticks, seconds, self.engine.seed, outcome))
+
+    #Takes the best length saved in the stats once the writer has read it, the first frames are drawn without waiting
+    #for the disk and show the best length of this session until then.
+    def check_saved_best(self):
+        best = self.stats.stored_best()
+        if best is not None:
+            self.read_best = True
+            self.highscore = max(self.highscore, best)
 
     #Checks if the current score is greater than the high score, if so, the highscore's value is the same as the score.
     def update_highscore(self):
-        if len(self.snake.parts) > self.highscore:
-            self.highscore = len(self.snake.parts)
+        if self.snake.length > self.highscore:
+            self.highscore = self.snake.length
 
     #Renders the length and best length (highscore).
-    def display_scores(self):
-        score = JOKERMAN.render("Length: " + str(len(self.snake.parts)), CYAN)
-        highscore = JOKERMAN.render("Best Length: " + str(self.highscore), CYAN)
-        self.window.blit(score[0], (10, 15))
-        self.window.blit(highscore[0], (WIDTH/2 - highscore[1].width/2, 15))
+    #Returns the rects that changed, which is none unless one of the scores changed or force is true.
+    def display_scores(self, force = False):
+        changed = self.score_text.update("Length: " + str(self.snake.length))
+        changed = self.highscore_text.update("Best Length: " + str(self.highscore)) or changed
+        if not changed and not force:
+            return []
+        for rect in self.drawn_scores:
+            self.window.fill(BLACK, rect)
+        score = self.window.blit(self.score_text.surface, (10, 15))
+        highscore_width = self.highscore_text.surface.get_width()
+        highscore = self.window.blit(self.highscore_text.surface, (WIDTH/2 - highscore_width/2, 15))
+        rects = self.drawn_scores + [score, highscore]
+        self.drawn_scores = [score, highscore]
+        return rects
 
     #Called at the beginning of the game and then each time the player loses and decides to play again.
     def init(self):
-        self.snake.construct(5)
-        self.food_list = pygame.sprite.Group()              #Used to detect collision of the head with food.
-        self.sprites = pygame.sprite.Group()                #Every sprite is added to this group for rendering.
-        self.sprites.add(iter(self.snake.parts))            #Add all of the snake's parts.
+        self.engine.reset(5, random.getrandbits(32), spawn = False)     #The food is spawned by the ADDFOOD timer.
+        self.camera.center(*self.head_position())
+        self.snake.head.queue.clear()
+        if self.snake.head.pilot is not None:
+            self.snake.head.pilot.reset(self.engine)
+        self.menu = None
+        self.redraw = True
+        if self.record_dir is not None:
+            file.verify_dir(self.record_dir)
+            name = time.strftime("%Y%m%d-%H%M%S") + ".snkr"
+            self.recorder = replay.Recorder(os.path.join(self.record_dir, name), self.engine)
         self.update_highscore()
+        if self.broadcaster is not None:
+            self.broadcaster.new_game(self.engine, self.highscore)
+        self.started = time.perf_counter()
+        self.paused_time = 0
         pygame.time.set_timer(Game.ADDFOOD, 1500, True)     #A one-time timer to spawn the food 1.5 secs after the game started.
 
-    #Spawns food in a random place on the map.
-    #If the food is spawned somewhere that collides with the snake, the food is respawned until it finds an empty spot.
-    def spawn_food(self):
-        food = Food()
-        if self.snake.collided_food(food):
-            food.kill()
-            self.spawn_food()
-        else: 
-            self.sprites.add(food)
-            self.food_list.add(food)
-
     #Called at each frame to handle the game's events.
+    #While the settings menu is open, clicks and key presses go to the menu instead of the game.
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif self.menu is not None and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONUP):
+                if event.type == pygame.MOUSEBUTTONUP and self.settings_btn.rect.collidepoint(event.pos):
+                    self.resume()
+                else:
+                    self.menu.handle(event)
             elif event.type == Game.ADDFOOD:
-                self.spawn_food()
+                self.engine.spawn_food()
+                if self.recorder is not None:
+                    self.recorder.spawned()
+                if self.broadcaster is not None:
+                    self.broadcaster.food(self.engine)
             elif event.type == pygame.MOUSEBUTTONUP:
                 self.settings_btn.was_clicked(event.pos[0], event.pos[1])
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and (self.profiler or self.autopilot):
+                self.overlay = not self.overlay
+                self.redraw = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+                self.toggle_autopilot()
+            elif event.type == pygame.KEYDOWN:
+                self.snake.head.key_down(event.key)
 
     #Borders visibly define the playable area on the game window.
+    #Boards smaller than the playable area also get a border around the board itself.
     def draw_borders(self):
-        pygame.draw.line(self.window, WHITE, (0, 50), (WIDTH-1, 50), 1)
+        pygame.draw.line(self.window, WHITE, (0, HEADER), (WIDTH-1, HEADER), 1)
         pygame.draw.line(self.window, WHITE, (0, HEIGHT-1), (WIDTH-1, HEIGHT-1), 1)
         pygame.draw.line(self.window, WHITE, (0, 0), (0, HEIGHT-1), 1)
         pygame.draw.line(self.window, WHITE, (WIDTH-1, 0), (WIDTH-1, HEIGHT-1), 1)
+        if self.camera.view != PLAY_AREA:
+            pygame.draw.rect(self.window, WHITE, self.camera.view.inflate(2, 2), 1)
+
+    #Remembers the cells changed by the engine's last step: the new head, the part behind it and the vacated tail.
+    def mark_dirty(self):
+        self.dirty_cells.add(self.engine.head)
+        if self.engine.length > 1:
+            self.dirty_cells.add(self.engine.body[1])       #The old head, which has to lose its eyes.
+        if self.engine.vacated is not None:
+            self.dirty_cells.add(self.engine.vacated)
+
+    #Position of the head on the board in pixels, as it's drawn alpha of the way into its cell.
+    def head_position(self, alpha = 1.0):
+        col, row = self.engine.position(self.engine.head)
+        shift = round(CELL * (1 - alpha))
+        return col * CELL - self.engine.direction[0] * shift, row * CELL - self.engine.direction[1] * shift
 
     #Renders everything to the screen.
-    def render(self):
+    #Unless full_redraw is set, only the changed cells and scores are drawn and sent to the display after the first frame.
+    #Every frame the camera scrolls, which only happens on boards bigger than the playable area, is drawn in full.
+    #alpha is the fraction of the time between ticks that has passed since the last tick, see Snake.render.
+    def render(self, alpha = 1.0):
+        self.alpha = alpha
+        if self.camera.follow(*self.head_position(alpha)):
+            self.redraw = True
+        if self.full_redraw or self.redraw:
+            self.render_full(alpha)
+        else:
+            self.render_dirty(alpha)
+
+    #Draws the settings menu over the game as it was when it was paused, only if the menu changed since it was last drawn.
+    def render_menu(self):
+        if self.menu.changed:
+            self.draw_all(self.alpha)
+            self.menu.draw(self.window)
+            pygame.display.flip()
+
+    #Redraws the whole window.
+    def render_full(self, alpha = 1.0):
+        self.draw_all(alpha)
+        pygame.display.flip()
+        self.dirty_cells.clear()
+        self.drawn_food = self.engine.food
+        self.motion_cells = self.snake.moving_cells() if alpha < 1 else []
+        self.redraw = False
+
+    #Draws everything onto the window without updating the display.
+    #The board is drawn clipped to the camera's view, and only what's inside the view is drawn.
+    def draw_all(self, alpha):
         self.window.fill(BLACK)   #Erases all drawings from last frame.
-        self.snake.render()
-        for sprite in self.sprites:
-            self.window.blit(sprite.surface, sprite.rect)
-        self.display_scores()
+        self.camera.draw_background(self.window)
+        self.window.set_clip(self.camera.view)
+        self.food.render(self.window, self.engine)
+        self.snake.render(self.window, alpha)
+        self.window.set_clip(None)
+        self.display_scores(force = True)
         self.window.blit(self.settings_btn.surface, self.settings_btn.rect)
         self.draw_borders()
-        pygame.display.flip()
-
-    #Displays game over text.
-    def you_lose(self):
+        if self.overlay:
+            self.draw_overlay()
+
+    #Redraws only the cells that changed since the last frame, and the scores if they changed.
+    #Between ticks, the cells the snake is moving through are redrawn on every frame, along with those of the last frame.
+    #Cells outside the camera's view are skipped, they're drawn when the view scrolls over them.
+    def render_dirty(self, alpha = 1.0):
+        moving = alpha < 1
+        if self.overlay:
+            self.dirty_cells |= self.camera.cells_in(OVERLAY_RECT)
+        self.dirty_cells.update(self.motion_cells)
+        self.motion_cells = self.snake.moving_cells() if moving else []
+        self.dirty_cells.update(self.motion_cells)
+        if self.engine.food != self.drawn_food:
+            self.dirty_cells.add(self.drawn_food)
+            self.dirty_cells.add(self.engine.food)
+            self.drawn_food = self.engine.food
+        self.dirty_cells.discard(None)
+        rects = []
+        self.window.set_clip(self.camera.view)
+        for cell in self.dirty_cells:
+            if not self.camera.visible(cell):
+                continue
+            if self.engine.occupied[cell] and not (moving and cell == self.engine.head):
+                rects.append(self.snake.render_part(self.window, cell, eyes = not moving))
+            else:
+                rects.append(self.camera.erase(self.window, cell))
+        if self.engine.food in self.dirty_cells:
+            self.food.render(self.window, self.engine)
+        if moving:
+            self.snake.render_motion(self.window, alpha)
+        self.window.set_clip(None)
+        self.dirty_cells.clear()
+        rects += self.display_scores()
+        self.draw_borders()                                 #Cells on the edges overlap the borders.
+        if self.overlay:
+            rects.append(self.draw_overlay())
+        pygame.display.update(rects)
+
+    #Draws the profiler's timings, and the autopilot's if it was used, over the top left of the playable area and returns
+    #the rect it covers.
+    #The text is only worked out again once a second.
+    def draw_overlay(self):
+        now = time.perf_counter()
+        if now - self.overlay_time >= 1:
+            self.overlay_lines = self.profiler.lines() if self.profiler is not None else [profiler.HEADER]
+            if self.autopilot is not None:
+                self.overlay_lines += self.autopilot.lines()
+            self.overlay_time = now
+        font = assets.shared.font(assets.EIGHT_BIT, OVERLAY_FONT_SIZE)
+        self.window.fill(BLACK, OVERLAY_RECT)
+        for i, line in enumerate(self.overlay_lines):
+            font.render_to(self.window, (OVERLAY_RECT.left + 4, OVERLAY_RECT.top + 4 + i * 12), line, WHITE)
+        pygame.draw.rect(self.window, WHITE, OVERLAY_RECT, 1)
+        return OVERLAY_RECT
+
+    #Displays game over text, or winning text if the snake filled the whole board.
+    def you_lose(self, won = False):
         self.window.fill(BLACK)
-        self.display_scores()
-        text_surf, text_rect = EIGHT_BIT.render("Game Over, press ENTER to replay or ESC to quit.", WHITE)
+        self.display_scores(force = True)
+        title = "You Win" if won else "Game Over"
+        font = assets.shared.font(assets.EIGHT_BIT, FONT_SIZE)
+        text_surf, text_rect = font.render(title + ", press ENTER to replay or ESC to quit.", WHITE)
         text_rect.center = (WIDTH/2, HEIGHT/2)
         self.window.blit(text_surf, text_rect)
         pygame.display.flip()
 
-    #Called when the snake dies, allowing the player to play again or quit.
-    def game_over(self):
-        self.you_lose()
-        deciding = True     
-        while deciding:
+    #Called when the snake dies or fills the board, allowing the player to play again or quit.
+    #While the autopilot is on, a new game starts by itself after ATTRACT_DELAY seconds.
+    #Returns true if a new game was started.
+    def game_over(self, won = False):
+        self.you_lose(won)
+        restart = time.perf_counter() + ATTRACT_DELAY if self.snake.head.pilot is not None else None
+        while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    deciding = False
                     self.running = False
+                    return False
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_RETURN:
                         self.init()
-                        self.loop()
-                        deciding = False
+                        return True
+            if restart is not None and time.perf_counter() >= restart:
+                self.init()
+                return True
+            pygame.time.wait(10)
+
+    #Steps the game once with the next queued turn, and plays the sounds and updates the scores that go with it.
+    def tick(self):
+        self.snake.head.change_direction()
+        outcome = self.engine.step()
+        if self.recorder is not None:
+            self.recorder.step(outcome)
+        if outcome == engine.DIED:
+            self.snake.death_sound.play(self.sound)
+        elif outcome == engine.ATE or outcome == engine.WON:
+            self.snake.eat_sound.play(self.sound)
+            self.update_highscore()
+        if self.broadcaster is not None:
+            self.broadcaster.step(self.engine, outcome, self.highscore)
+        if outcome != engine.DIED:
+            self.mark_dirty()
+        return outcome
 
     #Game loop.
+    #The game is stepped at a fixed tick_rate however often frames are drawn: the time passed since the last frame is
+    #added to an accumulator, and a tick is run for every whole tick's worth of time in it. What's left over is how far
+    #the next tick is, which frames use to draw the snake between cells.
+    #If the profiler is enabled, each phase of the frame is marked as it ends.
     def loop(self):
+        timer = self.profiler
+        tick_time = 1 / self.tick_rate
+        accumulator = 0.0
+        self.last_frame_time = time.perf_counter()
         while self.running:
+            if timer is not None:
+                timer.start_frame()
             self.handle_events()
-            pressed_keys = pygame.key.get_pressed()
-            self.snake.head.change_direction(pressed_keys)
-            if self.snake.collided_body():
-                self.snake.death_sound.play(self.sound)
-                self.game_over()
-                break
-            if self.snake.head_collided_food(self.food_list):
-                new_part = self.snake.grow()
-                self.sprites.add(new_part)
-                self.snake.eat_sound.play(self.sound)
-                self.update_highscore()
-                self.spawn_food()
+            if not self.read_best:
+                self.check_saved_best()
+            if timer is not None:
+                timer.mark()
+            now = time.perf_counter()
+            if self.menu is None:
+                accumulator = min(accumulator + now - self.last_frame_time, MAX_CATCH_UP * tick_time)
+            self.last_frame_time = now
+            while accumulator >= tick_time and self.running:
+                accumulator -= tick_time
+                outcome = self.tick()
+                if outcome == engine.DIED or outcome == engine.WON:
+                    self.record_game("died" if outcome == engine.DIED else "won")
+                    self.stop_recording()
+                    if not self.game_over(won = outcome == engine.WON):
+                        return
+                    accumulator = 0.0
+                    self.last_frame_time = time.perf_counter()
+                    break
+            if timer is not None:
+                timer.mark()
+            if self.menu is not None:
+                self.render_menu()
             else:
-                self.snake.slither()
-            self.render()
-            self.clock.tick(15)
+                self.render(accumulator / tick_time if self.interpolate and self.engine.ticks else 1.0)
+                if "first_frame" not in self.startup:
+                    self.first_frame()
+            if timer is not None:
+                timer.mark()
+            self.clock.tick(self.fps)
+            if timer is not None:
+                timer.mark()
+                timer.end_frame()
+        self.record_game("quit")
+        self.stop_recording()
+
+    #Finishes the replay file of the current game, if it's being recorded.
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description = "Snakery")
+    parser.add_argument("--record", metavar = "DIR", help = "record every game to a replay file in DIR")
+    parser.add_argument("--profile", metavar = "FILE",
+                        help = "time each phase of every frame, F3 shows the timings, saved to FILE (.csv or .json) on exit")
+    parser.add_argument("--tick-rate", type = int, default = TICK_RATE, help = "times the game is stepped per second")
+    parser.add_argument("--fps", type = int, default = FPS, help = "cap on frames drawn per second, 0 for no cap")
+    parser.add_argument("--vsync", action = "store_true", help = "draw frames in step with the display's refresh rate")
+    parser.add_argument("--no-interpolation", action = "store_true", help = "only draw the snake on whole cells")
+    parser.add_argument("--cols", type = int, default = COLS, help = f"board width in cells, up to {MAX_BOARD}")
+    parser.add_argument("--rows", type = int, default = ROWS, help = f"board height in cells, up to {MAX_BOARD}")
+    parser.add_argument("--autopilot", action = "store_true",
+                        help = "let the autopilot play, starting each new game by itself, F2 turns it on and off")
+    parser.add_argument("--serve", metavar = "ADDRESS", nargs = "?", const = "",
+                        help = "stream the game to viewers on HOST:PORT or unix:PATH (127.0.0.1:7777 if not given), "
+                               "watch it with python broadcast.py ADDRESS")
+    parser.add_argument("--startup-report", metavar = "FILE",
+                        help = "close once the first frame is drawn and save the startup times to FILE as JSON")
+    args = parser.parse_args()
+    for size in (args.cols, args.rows):
+        if not MIN_BOARD <= size <= MAX_BOARD:
+            parser.error(f"the board must be between {MIN_BOARD} and {MAX_BOARD} cells wide and high")
+    game = Game(args.tick_rate, args.fps, args.vsync, args.cols, args.rows)
+    game.interpolate = not args.no_interpolation
+    game.quit_after_first_frame = args.startup_report is not None
+    game.record_dir = args.record
+    if args.profile:
+        game.enable_profiler()
+    if args.autopilot:
+        game.toggle_autopilot()
+    if args.serve is not None:
+        import broadcast                    #Imported only when serving, asyncio adds to the time the game takes to start.
+        address = args.serve or broadcast.DEFAULT_ADDRESS
+        try:
+            game.broadcaster = broadcast.Broadcaster(address)
+        except (OSError, ValueError) as error:
+            parser.error(f"can't serve on {address}: {error}")
     game.init()
     game.loop()
-    game.write_highscore()
\ No newline at end of file
+    if args.startup_report:
+        print(game.startup_report())
+        with open(args.startup_report, "w") as writer:
+            json.dump(game.startup, writer, indent = 1)
+    game.stats.close()
+    if game.broadcaster is not None:
+        game.broadcaster.close()
+    if game.autopilot is not None:
+        print("\n".join([profiler.HEADER] + game.autopilot.lines()))
+    if args.profile:
+        game.profiler.dump(args.profile)
+        print(assets.shared.report())
+        if game.first_frame_loads is not None:
+            print(f"loaded after the first frame: {assets.shared.load_count() - game.first_frame_loads}")
\ No newline at end of file
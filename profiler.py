@@ -0,0 +1,92 @@
+#Profiler.py
+#Times each phase of the game loop's frames, to show where a frame's budget goes.
+#Frame times are kept in fixed size ring buffers, so profiling a long session uses the same memory as a short one.
+#The game only creates a profiler when asked to, and skips every call to it otherwise.
+
+import json
+import time
+from array import array
+
+HEADER = "  phase    p50    p95    p99 ms"      #Heading of the columns of lines.
+
+#Records how long each phase of the last `frames` frames took, in nanoseconds.
+#Call start_frame at the top of the loop, mark after each phase, and end_frame once the frame is done.
+#A frame is counted as dropped when its work took longer than budget_ns, the time a frame is allowed at the game's frame
+#rate. Time spent in the wait phase, sleeping until the next frame is due, doesn't count as work.
+class Profiler():
+    def __init__(self, phases, budget_ns, frames = 900, wait = None):
+        self.phases = tuple(phases)
+        self.budget_ns = budget_ns
+        self.wait = self.phases.index(wait) if wait is not None else None
+        self.size = frames
+        self.samples = [array("q", bytes(8 * frames)) for phase in phases]
+        self.totals = array("q", bytes(8 * frames))
+        self.index = 0                  #Slot of the ring buffers the current frame is written to.
+        self.count = 0                  #Number of frames recorded, including those since overwritten.
+        self.dropped = 0
+        self.phase = 0
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def start_frame(self):
+        self.phase = 0
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    #Ends the current phase, the phases must be marked in the order they were given.
+    def mark(self):
+        now = time.perf_counter_ns()
+        self.samples[self.phase][self.index] = now - self.last
+        self.phase += 1
+        self.last = now
+
+    def end_frame(self):
+        total = self.last - self.frame_start
+        self.totals[self.index] = total
+        if self.wait is not None:
+            total -= self.samples[self.wait][self.index]
+        if total > self.budget_ns:
+            self.dropped += 1
+        self.count += 1
+        self.index = (self.index + 1) % self.size
+
+    #Returns the recorded values of one ring buffer from the oldest to the newest frame.
+    def ordered(self, buffer):
+        if self.count < self.size:
+            return buffer[:self.count]
+        return buffer[self.index:] + buffer[:self.index]
+
+    #Returns the 50th, 95th and 99th percentiles of a ring buffer, in nanoseconds.
+    def percentiles(self, buffer):
+        values = sorted(self.ordered(buffer))
+        if not values:
+            return 0, 0, 0
+        return tuple(values[min(len(values) - 1, int(len(values) * p))] for p in (0.5, 0.95, 0.99))
+
+    #Percentiles of every phase and of whole frames, keyed by phase name.
+    def summary(self):
+        stats = {phase: self.percentiles(self.samples[i]) for i, phase in enumerate(self.phases)}
+        stats["frame"] = self.percentiles(self.totals)
+        return stats
+
+    #Lines of text describing the recorded frames, in milliseconds, as shown by the game's overlay.
+    def lines(self):
+        lines = [HEADER]
+        for phase, (p50, p95, p99) in self.summary().items():
+            lines.append(f"{phase:>7} {p50 / 1e6:6.2f} {p95 / 1e6:6.2f} {p99 / 1e6:6.2f}")
+        lines.append(f"dropped {self.dropped}/{self.count}")
+        return lines
+
+    #Writes the recorded frames to a file, as CSV if the path ends with .csv and as JSON otherwise.
+    def dump(self, path):
+        columns = [self.ordered(buffer) for buffer in self.samples] + [self.ordered(self.totals)]
+        first = self.count - len(columns[-1])
+        if path.endswith(".csv"):
+            with open(path, "w") as writer:
+                writer.write("frame," + ",".join(self.phases) + ",total\n")
+                for i, row in enumerate(zip(*columns)):
+                    writer.write(f"{first + i}," + ",".join(map(str, row)) + "\n")
+        else:
+            frames = [dict(zip(self.phases + ("total",), row), frame = first + i) for i, row in enumerate(zip(*columns))]
+            summary = {phase: dict(p50 = p50, p95 = p95, p99 = p99) for phase, (p50, p95, p99) in self.summary().items()}
+            with open(path, "w") as writer:
+                json.dump(dict(budget_ns = self.budget_ns, frames_recorded = self.count, dropped = self.dropped,
+                               summary = summary, frames = frames), writer, indent = 1)
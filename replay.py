@@ -0,0 +1,214 @@
+#Replay.py
+#Records games to compact binary files and plays them back through the engine.
+#A replay only stores what the engine can't work out by itself: the direction taken on every tick, packed two to a byte,
+#and every cell the food was placed on. Playback steps an engine.Engine through the same rules the game ran.
+#
+#File layout, all integers little endian:
+#   header:  magic "SNKR", version, cols, rows, ticks per block, seed (-1 if none).
+#   blocks:  each block holds a snapshot of the game at its first tick (direction, food, body from head to tail),
+#            the food cells placed during the block, and one nibble per tick of the block.
+#   footer:  the start tick and file offset of every block, then the total ticks, the footer's offset, the number of
+#            blocks and the magic "SNKE".
+#The footer lets a reader jump straight to the block holding any tick, so seeking costs at most one block of steps.
+#If the game crashed before the footer was written, the blocks are found by walking the file instead.
+
+import argparse
+import mmap
+import struct
+from array import array
+
+import engine
+
+MAGIC = b"SNKR"
+END_MAGIC = b"SNKE"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHIq")              #magic, version, cols, rows, ticks per block, seed
+BLOCK = struct.Struct("<QIIBiI")                #start tick, ticks, foods, direction, food, length
+INDEX = struct.Struct("<QQ")                    #start tick, offset
+TRAILER = struct.Struct("<QQI4s")               #total ticks, footer offset, blocks, magic
+
+DIRECTIONS = (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+SPAWNED = 4                                     #Nibble flag: food was placed on the board just before this tick.
+NO_FOOD = -1
+
+#Writes a game to a replay file as it's played.
+#Call spawned after placing food outside of a step, and step after every call to the engine's step.
+#Ticks are kept in memory and written a whole block at a time, so recording doesn't make a system call per tick.
+class Recorder():
+    def __init__(self, path, game, interval = 1024):
+        self.game = game
+        self.interval = interval
+        self.writer = open(path, "wb")
+        seed = game.seed if isinstance(game.seed, int) else -1
+        self.writer.write(HEADER.pack(MAGIC, VERSION, game.cols, game.rows, interval, seed))
+        self.index = []
+        self.ticks = 0
+        self.start_block()
+
+    #Takes a snapshot of the game for the block starting at the current tick.
+    def start_block(self):
+        self.block_start = self.ticks
+        self.snapshot = (DIRECTIONS.index(self.game.direction), snapshot_food(self.game.food), array("I", self.game.body))
+        self.foods = array("I")
+        self.nibbles = bytearray()
+        self.flags = 0
+
+    def spawned(self):
+        self.flags = SPAWNED
+        self.foods.append(self.game.food)
+
+    def step(self, outcome):
+        nibble = DIRECTIONS.index(self.game.direction) | self.flags
+        self.flags = 0
+        count = self.ticks - self.block_start
+        if count % 2 == 0:
+            self.nibbles.append(nibble)
+        else:
+            self.nibbles[-1] |= nibble << 4
+        if outcome == engine.ATE:
+            self.foods.append(self.game.food)
+        self.ticks += 1
+        if self.ticks - self.block_start == self.interval:
+            self.write_block()
+            self.start_block()
+
+    def write_block(self):
+        direction, food, body = self.snapshot
+        self.index.append((self.block_start, self.writer.tell()))
+        self.writer.write(BLOCK.pack(self.block_start, self.ticks - self.block_start, len(self.foods), direction, food,
+                                     len(body)))
+        self.writer.write(body.tobytes())
+        self.writer.write(self.foods.tobytes())
+        self.writer.write(self.nibbles)
+
+    #Writes the last block and the footer, then closes the file.
+    def close(self):
+        if self.ticks > self.block_start or not self.index:
+            self.write_block()
+        footer = self.writer.tell()
+        for entry in self.index:
+            self.writer.write(INDEX.pack(*entry))
+        self.writer.write(TRAILER.pack(self.ticks, footer, len(self.index), END_MAGIC))
+        self.writer.close()
+
+def snapshot_food(food):
+    return NO_FOOD if food is None else food
+
+#Reads a replay file through a memory map, and steps an engine to any tick of the game.
+class Player():
+    def __init__(self, path):
+        self.reader = open(path, "rb")
+        self.map = mmap.mmap(self.reader.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.cols, self.rows, self.interval, seed = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a snakery replay.")
+        self.seed = None if seed == -1 else seed
+        self.read_index()
+
+    #Reads the block index from the footer, or by walking the blocks if the recording wasn't closed.
+    def read_index(self):
+        self.index = []
+        if len(self.map) >= HEADER.size + TRAILER.size:
+            self.ticks, footer, blocks, magic = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+            if magic == END_MAGIC:
+                self.index = [INDEX.unpack_from(self.map, footer + i * INDEX.size) for i in range(blocks)]
+                return
+        offset = HEADER.size
+        self.ticks = 0
+        while offset + BLOCK.size <= len(self.map):
+            start, ticks, foods, direction, food, length = BLOCK.unpack_from(self.map, offset)
+            end = offset + BLOCK.size + 4 * (length + foods) + (ticks + 1) // 2
+            if end > len(self.map):
+                break
+            self.index.append((start, offset))
+            self.ticks = start + ticks
+            offset = end
+
+    #Returns the block starting at the given offset as its header fields, body, foods and nibbles.
+    def read_block(self, offset):
+        start, ticks, foods, direction, food, length = BLOCK.unpack_from(self.map, offset)
+        offset += BLOCK.size
+        body = array("I", self.map[offset:offset + 4 * length])
+        offset += 4 * length
+        food_cells = array("I", self.map[offset:offset + 4 * foods])
+        offset += 4 * foods
+        nibbles = self.map[offset:offset + (ticks + 1) // 2]
+        return start, ticks, DIRECTIONS[direction], None if food == NO_FOOD else food, body, food_cells, nibbles
+
+    #Creates an engine sized for this replay.
+    def create_engine(self):
+        return engine.Engine(self.cols, self.rows, self.seed)
+
+    #Puts the game in the position it was in after the given number of ticks.
+    #The nearest snapshot before the tick is restored, then at most one block of ticks is stepped.
+    def seek(self, game, tick):
+        tick = max(0, min(tick, self.ticks))
+        block = min(tick // self.interval, len(self.index) - 1)
+        start, direction, food, body = self.load_block(block)
+        game.place(body, direction, food, start)
+        self.game = game
+        self.tick = start
+        while self.tick < tick:
+            self.step()
+
+    #Makes the given block the one ticks are stepped from, and returns its start tick and snapshot.
+    def load_block(self, block):
+        start, ticks, direction, food, body, foods, nibbles = self.read_block(self.index[block][1])
+        self.block = block
+        self.foods = foods
+        self.food_cursor = 0
+        self.nibbles = nibbles
+        self.block_ticks = ticks
+        return start, direction, food, body
+
+    #Steps the game by the next recorded tick and returns the outcome, or None once the recording has ended.
+    def step(self):
+        if self.tick >= self.ticks:
+            return None
+        count = self.tick - self.index[self.block][0]
+        if count == self.block_ticks:
+            self.load_block(self.block + 1)         #The game is already in the position of the next block's snapshot.
+            count = 0
+        nibble = self.nibbles[count // 2] >> (4 * (count % 2)) & 0xF
+        if nibble & SPAWNED:
+            self.game.food = self.next_food()
+        outcome = self.game.step(DIRECTIONS[nibble & 3])
+        if outcome == engine.ATE:
+            self.game.food = self.next_food()
+        self.tick += 1
+        return outcome
+
+    def next_food(self):
+        food = self.foods[self.food_cursor]
+        self.food_cursor += 1
+        return food
+
+    def close(self):
+        self.map.close()
+        self.reader.close()
+
+#Plays a replay in a game window, starting from the given tick.
+def watch(path, tick):
+    import main                                 #Only needed to draw the game, the rest of this module runs headless.
+    player = Player(path)
+    game = main.Game(cols = player.cols, rows = player.rows)
+    player.seek(game.engine, tick)
+    game.camera.center(*game.head_position())
+    game.redraw = True
+    while game.running:
+        game.handle_events()
+        if not game.read_best:
+            game.check_saved_best()
+        outcome = player.step()
+        if outcome is not None:
+            game.mark_dirty()
+        game.render()
+        game.clock.tick(main.TICK_RATE)
+    player.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = "Play back a recorded game.")
+    parser.add_argument("path")
+    parser.add_argument("--tick", type = int, default = 0, help = "tick to start playing from")
+    args = parser.parse_args()
+    watch(args.path, args.tick)
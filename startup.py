@@ -0,0 +1,103 @@
+#Startup.py
+#Measures how long the game takes to start: launches it in fresh processes, under SDL's dummy drivers, and has it close
+#as soon as its first frame is drawn.
+#Reports the median time of each step of starting up, the modules that took longest to import, and whether every step
+#stayed within its budget. Results are saved as JSON, so they can be tracked from one change to the next.
+#Example: python startup.py --runs 10 --out startup.json
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+#Most milliseconds each step may take, measured from when main.py starts loading.
+#process is the time from launching python to the game closing, which includes starting the interpreter.
+BUDGETS = dict(imports = 200, display = 220, game = 230, first_frame = 250, process = 500)
+
+GAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+#Returns a copy of the environment that runs the game without a display or audio device.
+def headless_env():
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    return env
+
+#Returns a copy of the headless environment whose home and data directories are the given folder, so the game saves
+#its stats there instead of among the player's own.
+def sandbox_env(folder):
+    env = headless_env()
+    for name in ("HOME", "USERPROFILE", "XDG_DATA_HOME", "LOCALAPPDATA"):
+        env[name] = folder
+    return env
+
+#Starts the game once and returns its startup times in milliseconds, along with the time the whole process took.
+#Every run starts from an empty data directory, as on a first launch.
+def run_once():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "startup.json")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, GAME, "--startup-report", path], env = sandbox_env(folder),
+                       cwd = os.path.dirname(GAME), check = True, stdout = subprocess.DEVNULL)
+        process = time.perf_counter() - start
+        with open(path) as reader:
+            steps = json.load(reader)
+    times = {step: seconds * 1000 for step, seconds in steps.items()}
+    times["process"] = process * 1000
+    return times
+
+#Imports the game with python's -X importtime and returns main.py's slowest imports as (milliseconds, module) pairs.
+#Each time includes the modules the import pulled in.
+def slowest_imports(count):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env = headless_env(),
+                            cwd = os.path.dirname(GAME), capture_output = True, text = True, check = True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2           #main.py is at depth 0, the modules it imports at 1.
+        if fields[0].strip().isdigit() and depth == 1:
+            imports.append((int(fields[1]) / 1000, name.strip()))
+    return sorted(imports, reverse = True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure how long the game takes to start.")
+    parser.add_argument("--runs", type = int, default = 5, help = "times the game is started")
+    parser.add_argument("--out", default = "startup.json", help = "file to save the results to")
+    parser.add_argument("--imports", type = int, default = 8, help = "number of slowest imports to list")
+    args = parser.parse_args()
+
+    runs = [run_once() for i in range(args.runs)]
+    medians = {step: statistics.median(run[step] for run in runs) for step in runs[0]}
+    over = []
+    print(f"Median of {args.runs} runs:")
+    for step, ms in medians.items():
+        budget = BUDGETS.get(step)
+        verdict = ""
+        if budget is not None:
+            verdict = f"budget {budget:>5} ms " + ("OVER" if ms > budget else "ok")
+            if ms > budget:
+                over.append(step)
+        print(f"{step:>12}: {ms:7.1f} ms  {verdict}")
+    imports = slowest_imports(args.imports)
+    print("\nSlowest imports:")
+    for ms, name in imports:
+        print(f"{ms:9.1f} ms  {name}")
+
+    meta = dict(python = platform.python_version(), platform = platform.platform(), time = time.strftime("%Y-%m-%d %H:%M:%S"))
+    with open(args.out, "w") as writer:
+        json.dump(dict(meta = meta, budgets = BUDGETS, medians = medians, runs = runs,
+                       imports = [dict(module = name, ms = ms) for ms, name in imports]), writer, indent = 1)
+    print(f"Saved to {args.out}")
+    if over:
+        sys.exit("Over budget: " + ", ".join(over))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#State.py
+#Game states cheap enough for lookahead search, such as MCTS or beam search, to fork thousands of times per move.
+#A State is made once from an engine snapshot, which becomes the root that every state forked from it shares: the body
+#as it was then and the board's occupancy, never copied again. Each state only keeps what changed since the root, the
+#cells its head went through and the cells whose occupancy changed, so cloning one costs the moves made since the root
+#however long the snake is and however big the board is.
+#Every state carries a Zobrist hash of its position, kept up to date on each step, for transposition tables.
+
+import functools
+from array import array
+
+import engine
+
+MASK = (1 << 64) - 1
+DIRECTIONS = (engine.UP, engine.DOWN, engine.LEFT, engine.RIGHT)
+SPAWN_TRIES = 32            #Random cells tried when placing food before falling back to listing the free cells.
+
+#Kinds of Zobrist keys, a position's hash is every key of its position xored together.
+BODY = 0
+HEAD = 1
+TAIL = 2
+FOOD = 3
+DIRECTION = 4
+
+#Mixes a 64 bit number into another (the splitmix64 finalizer), so nearby inputs give unrelated outputs.
+def mix(z):
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK
+    return z ^ (z >> 31)
+
+#Returns the Zobrist key of a kind of thing on a cell, or of a direction's index.
+#Keys are worked out from their inputs instead of drawn at random, so a hash is the same in every process and every run
+#and no table the size of the board is needed.
+@functools.lru_cache(maxsize = 1 << 16)
+def key(kind, value):
+    return mix((value * 8 + kind + 1) * 0x9E3779B97F4A7C15 & MASK)
+
+#Returns the hash of a position, the same as the hash a State in that position carries.
+#Positions with the same body cells, head, tail, direction and food hash alike, whatever the tick.
+def position_hash(body, direction, food):
+    value = key(HEAD, body[0]) ^ key(TAIL, body[-1]) ^ key(DIRECTION, DIRECTIONS.index(direction))
+    for cell in body:
+        value ^= key(BODY, cell)
+    if food is not None:
+        value ^= key(FOOD, food)
+    return value
+
+#What every state forked from the same snapshot shares: the body from tail to head and the occupancy of the board.
+class Root():
+    def __init__(self, snapshot):
+        self.cols = snapshot.cols
+        self.rows = snapshot.rows
+        self.size = snapshot.cols * snapshot.rows
+        self.cells = array("i", reversed(snapshot.body))
+        self.occupied = bytearray(self.size)
+        for cell in self.cells:
+            self.occupied[cell] = 1
+
+#A game position that can be stepped with the engine's rules and cloned.
+#The body is the root's cells followed by trail, the cells the head entered since the root, less the first cut cells,
+#which the tail has left. changes holds the occupancy of every cell that changed since the root.
+#Food eaten by a state is replaced on a cell picked from the state's hash and tick, so the same position always gets the
+#same food: it's not the food the engine would have placed.
+class State():
+    def __init__(self, snapshot = None, root = None):
+        if root is None:
+            root = Root(snapshot)
+        self.root = root
+        self.trail = []
+        self.cut = 0
+        self.changes = {}
+        if snapshot is not None:
+            self.direction = snapshot.direction
+            self.food = snapshot.food
+            self.ticks = snapshot.ticks
+            self.over = snapshot.over
+            self.won = snapshot.won
+            self.hash = position_hash(snapshot.body, snapshot.direction, snapshot.food)
+
+    #Returns a copy of the state, which shares its root with this one.
+    def clone(self):
+        copy = State(root = self.root)
+        copy.trail = self.trail[:]
+        copy.cut = self.cut
+        copy.changes = self.changes.copy()
+        copy.direction = self.direction
+        copy.food = self.food
+        copy.ticks = self.ticks
+        copy.over = self.over
+        copy.won = self.won
+        copy.hash = self.hash
+        return copy
+
+    #Returns a snapshot of the state, which an engine can restore.
+    def snapshot(self):
+        return engine.Snapshot(self.root.cols, self.root.rows, array("i", self.body()), self.direction, self.food,
+                               self.ticks, self.over, self.won)
+
+    @property
+    def cols(self):
+        return self.root.cols
+
+    @property
+    def rows(self):
+        return self.root.rows
+
+    #Returns the cell at the given index of the root's cells followed by the trail.
+    def part(self, index):
+        cells = self.root.cells
+        return cells[index] if index < len(cells) else self.trail[index - len(cells)]
+
+    @property
+    def head(self):
+        return self.trail[-1] if self.trail else self.root.cells[-1]
+
+    @property
+    def tail(self):
+        return self.part(self.cut)
+
+    @property
+    def length(self):
+        return len(self.root.cells) + len(self.trail) - self.cut
+
+    #The body's cells from head to tail.
+    def body(self):
+        cells = self.root.cells
+        return self.trail[::-1][:self.length] + (cells[self.cut:][::-1].tolist() if self.cut < len(cells) else [])
+
+    def is_occupied(self, cell):
+        return self.changes.get(cell, self.root.occupied[cell])
+
+    def cell(self, col, row):
+        return (row % self.rows) * self.cols + col % self.cols
+
+    def position(self, cell):
+        row, col = divmod(cell, self.cols)
+        return col, row
+
+    def next_cell(self):
+        col, row = self.position(self.head)
+        return self.cell(col + self.direction[0], row + self.direction[1])
+
+    def turn(self, direction):
+        if direction is not None and direction != engine.OPPOSITE[self.direction]:
+            self.hash ^= key(DIRECTION, DIRECTIONS.index(self.direction)) ^ key(DIRECTION, DIRECTIONS.index(direction))
+            self.direction = direction
+
+    #Advances the state by one tick and returns MOVED, ATE, DIED or WON, following the same rules as engine.Engine.step.
+    def step(self, direction = None):
+        if self.over:
+            return engine.WON if self.won else engine.DIED
+        self.turn(direction)
+        head = self.next_cell()
+        ate = head == self.food
+        if not ate and self.is_occupied(head) and head != self.tail:
+            self.over = True
+            return engine.DIED
+        self.hash ^= key(HEAD, self.head) ^ key(HEAD, head) ^ key(BODY, head)
+        if not ate:
+            tail = self.tail
+            self.changes[tail] = 0
+            self.cut += 1
+            self.hash ^= key(BODY, tail) ^ key(TAIL, tail) ^ key(TAIL, self.tail if self.length > 1 else head)
+        self.trail.append(head)
+        self.changes[head] = 1
+        self.ticks += 1
+        if ate:
+            self.hash ^= key(FOOD, head)
+            self.food = self.spawn_food()
+            if self.food is None:
+                self.over = True
+                self.won = True
+                return engine.WON
+            self.hash ^= key(FOOD, self.food)
+            return engine.ATE
+        return engine.MOVED
+
+    #Picks a free cell for the food from the state's hash and tick, or returns None if the snake fills the board.
+    def spawn_food(self):
+        size = self.root.size
+        z = self.hash ^ self.ticks
+        for attempt in range(SPAWN_TRIES):
+            z = mix(z + attempt + 1)
+            if not self.is_occupied(z % size):
+                return z % size
+        free = [cell for cell in range(size) if not self.is_occupied(cell)]
+        return free[z % len(free)] if free else None
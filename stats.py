@@ -0,0 +1,166 @@
+#Stats.py
+#Keeps the best length and the history of every game played in an SQLite database.
+#The game never waits on the disk while it's played: changes are put on a queue and written by a background thread,
+#which commits everything that queued up while it was busy in one transaction. A transaction is written whole or not at
+#all, so a crash can lose the games that were still queued but never leaves the database half written.
+#Example: python stats.py --games 20
+
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import file
+
+NAME = "stats.db"
+LEGACY_HIGHSCORE = os.path.join(os.path.expanduser("~"), "AppData/Local/Snakery/highscore.txt")
+
+SCHEMA = """
+create table if not exists games (
+    id integer primary key,
+    finished real not null,         -- unix time the game ended at
+    length integer not null,
+    ticks integer not null,
+    seconds real not null,          -- time played, not counting time spent paused
+    seed integer,
+    outcome text not null           -- died, won or quit
+);
+create table if not exists meta (key text primary key, value integer not null);
+"""
+
+#A finished game as it's stored in the history.
+class GameRecord():
+    def __init__(self, length, ticks, seconds, seed, outcome, finished = None):
+        self.length = length
+        self.ticks = ticks
+        self.seconds = seconds
+        self.seed = seed
+        self.outcome = outcome
+        self.finished = time.time() if finished is None else finished
+
+#Stores stats in the database in the given directory, which is created if needed.
+#Only the background thread opens the database for writing. The best length is read by it before anything is written,
+#and best waits for that first read, while stored_best doesn't.
+class Stats():
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, NAME)
+        self.queue = queue.Queue()
+        self.loaded = threading.Event()
+        self.best_length = 0
+        self.error = None               #The last error the writer ran into, it carries on with the next batch.
+        self.thread = threading.Thread(target = self.run, name = "stats writer", daemon = True)
+        self.thread.start()
+
+    #Returns the best length saved, waiting for the database to be opened if it hasn't been yet.
+    def best(self):
+        self.loaded.wait()
+        return self.best_length
+
+    #Returns the best length saved, or None if the database hasn't been opened yet, without waiting for it.
+    def stored_best(self):
+        return self.best_length if self.loaded.is_set() else None
+
+    #Queues a finished game to be added to the history, raising the best length if it's longer.
+    def add_game(self, record):
+        self.queue.put(("game", record))
+
+    #Queues the best length to be set back to 0, the history is kept.
+    def reset_best(self):
+        self.queue.put(("reset", None))
+
+    #Writes everything queued so far and stops the writer.
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    #Body of the writer thread.
+    #Each batch is everything on the queue once the first change of the batch arrives, committed together.
+    def run(self):
+        try:
+            connection = self.open()
+        except (sqlite3.Error, OSError) as error:
+            self.error = error                  #Nothing can be saved, but the game is still played.
+            self.loaded.set()
+            while self.queue.get() is not None:
+                pass
+            return
+        self.loaded.set()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+            try:
+                with connection:
+                    for kind, record in batch:
+                        self.write(connection, kind, record)
+            except sqlite3.Error as error:
+                self.error = error
+        connection.close()
+
+    #Opens the database, creating it if needed, and reads the best length.
+    #A new database takes the best length from the highscore.txt older versions of the game saved.
+    def open(self):
+        file.verify_dir(self.directory)
+        connection = sqlite3.connect(self.path)
+        connection.execute("pragma journal_mode = wal")
+        with connection:
+            connection.executescript(SCHEMA)
+            row = connection.execute("select value from meta where key = 'best'").fetchone()
+            if row is None:
+                connection.execute("insert into meta values ('best', ?)", (read_legacy_highscore(),))
+                row = connection.execute("select value from meta where key = 'best'").fetchone()
+        self.best_length = row[0]
+        return connection
+
+    def write(self, connection, kind, record):
+        if kind == "game":
+            row = (record.finished, record.length, record.ticks, record.seconds, record.seed, record.outcome)
+            connection.execute("insert into games (finished, length, ticks, seconds, seed, outcome) "
+                               "values (?, ?, ?, ?, ?, ?)", row)
+            connection.execute("update meta set value = max(value, ?) where key = 'best'", (record.length,))
+        elif kind == "reset":
+            connection.execute("update meta set value = 0 where key = 'best'")
+
+#Returns the highscore saved by older versions of the game, or 0 if there isn't one.
+def read_legacy_highscore():
+    try:
+        with open(LEGACY_HIGHSCORE) as reader:
+            return int(reader.readline())
+    except (OSError, ValueError):
+        return 0
+
+#Returns the best length and the most recent games saved in the given directory, newest first.
+def read_history(directory, games):
+    path = os.path.join(directory, NAME)
+    if not os.path.exists(path):
+        return 0, []
+    connection = sqlite3.connect(path)
+    try:
+        row = connection.execute("select value from meta where key = 'best'").fetchone()
+        rows = connection.execute("select length, ticks, seconds, seed, outcome, finished from games "
+                                  "order by id desc limit ?", (games,)).fetchall()
+    finally:
+        connection.close()
+    return row[0] if row else 0, [GameRecord(*row) for row in rows]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = "Show the saved best length and the most recent games.")
+    parser.add_argument("--games", type = int, default = 10, help = "number of recent games to list")
+    parser.add_argument("--dir", default = file.data_dir("Snakery"), help = "directory the stats are saved in")
+    args = parser.parse_args()
+    best, history = read_history(args.dir, args.games)
+    print(f"Best length: {best}")
+    for record in history:
+        finished = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.finished))
+        print(f"{finished}  length {record.length:>5}  ticks {record.ticks:>7}  {record.seconds:>7.1f} s  "
+              f"{record.outcome:>4}  seed {record.seed}")
@@ -0,0 +1,112 @@
+#Tournament.py
+#Plays thousands of seeded games for each scripted controller without a window, spread across every cpu core,
+#and prints how long each controller's snakes grew, how long they survived and how many games were played per second.
+#Example: python tournament.py --games 2000 greedy bfs
+
+import argparse
+import os
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import engine
+import controllers
+
+#Prepares a worker process before it plays its first game, so the first chunk doesn't pay for building the board's
+#hamiltonian cycle.
+def warm_start(cols, rows):
+    try:
+        controllers.hamiltonian_cycle(cols, rows)
+    except ValueError:
+        pass
+
+#Plays one game and returns the length the snake reached and the number of ticks it survived.
+#A game that hasn't ended after max_ticks is stopped there.
+def play(name, seed, cols, rows, max_ticks):
+    game = engine.Engine(cols, rows)
+    game.reset(5, seed)
+    controller = controllers.CONTROLLERS[name](seed)
+    controller.reset(game)
+    while game.ticks < max_ticks:
+        outcome = game.step(controller.next_direction(game))
+        if outcome == engine.DIED or outcome == engine.WON:
+            break
+    return game.length, game.ticks
+
+#Plays a chunk of seeds with one controller inside a worker process, and returns the results and the seconds it took.
+def play_chunk(name, seeds, cols, rows, max_ticks):
+    start = time.perf_counter()
+    results = [play(name, seed, cols, rows, max_ticks) for seed in seeds]
+    return name, results, time.perf_counter() - start
+
+#Totals of every game played by one controller, seconds is the time its games took summed over every worker.
+class Standings():
+    def __init__(self, name):
+        self.name = name
+        self.lengths = []
+        self.ticks = []
+        self.seconds = 0.0
+
+    def add(self, results, seconds):
+        self.seconds += seconds
+        for length, ticks in results:
+            self.lengths.append(length)
+            self.ticks.append(ticks)
+
+    #Length distribution as (length, number of games) pairs, with lengths grouped into buckets of the given size.
+    def histogram(self, bucket):
+        counts = Counter(length // bucket * bucket for length in self.lengths)
+        return sorted(counts.items())
+
+    def summary(self):
+        games = len(self.lengths)
+        return (f"{self.name:>12}: {games} games, length mean {statistics.mean(self.lengths):.1f} "
+                f"median {statistics.median(self.lengths):.0f} max {max(self.lengths)}, "
+                f"ticks mean {statistics.mean(self.ticks):.0f}, {games / self.seconds:,.0f} games/sec per worker")
+
+#Plays games seeded from first_seed onwards for every named controller and yields (name, results, seconds) as each
+#chunk finishes.
+#Chunks are handed to a pool of worker processes, one per cpu unless workers is given.
+def run(names, games, cols, rows, max_ticks, chunk = 50, workers = None, first_seed = 0):
+    with ProcessPoolExecutor(max_workers = workers, initializer = warm_start, initargs = (cols, rows)) as pool:
+        futures = []
+        for name in names:
+            for start in range(first_seed, first_seed + games, chunk):
+                seeds = range(start, min(start + chunk, first_seed + games))
+                futures.append(pool.submit(play_chunk, name, seeds, cols, rows, max_ticks))
+        for future in as_completed(futures):
+            yield future.result()
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare scripted snake controllers over many seeded games.")
+    parser.add_argument("controllers", nargs = "*", default = list(controllers.CONTROLLERS), metavar = "controller",
+                        help = "controllers to compare: " + ", ".join(controllers.CONTROLLERS))
+    parser.add_argument("--games", type = int, default = 1000, help = "games per controller")
+    parser.add_argument("--cols", type = int, default = 50)
+    parser.add_argument("--rows", type = int, default = 35)
+    parser.add_argument("--max-ticks", type = int, default = 5000, help = "ticks after which a game is stopped")
+    parser.add_argument("--chunk", type = int, default = 50, help = "games sent to a worker at a time")
+    parser.add_argument("--workers", type = int, default = os.cpu_count())
+    parser.add_argument("--bucket", type = int, default = 10, help = "width of the length histogram's buckets")
+    args = parser.parse_args()
+    for name in args.controllers:
+        if name not in controllers.CONTROLLERS:
+            parser.error(f"unknown controller {name}, choose from " + ", ".join(controllers.CONTROLLERS))
+
+    standings = {name: Standings(name) for name in args.controllers}
+    start = time.perf_counter()
+    played = 0
+    for name, results, seconds in run(args.controllers, args.games, args.cols, args.rows, args.max_ticks, args.chunk,
+                                      args.workers):
+        standings[name].add(results, seconds)
+        played += len(results)
+        print(f"\r{played}/{args.games * len(args.controllers)} games", end = "", flush = True)
+    elapsed = time.perf_counter() - start
+    print(f"\r{played} games in {elapsed:.2f} s, {played / elapsed:,.0f} games/sec on {args.workers} workers")
+    for name in args.controllers:
+        print(standings[name].summary())
+        print(" " * 14 + "  ".join(f"{length}+: {count}" for length, count in standings[name].histogram(args.bucket)))
+
+if __name__ == '__main__':
+    main()